@@ -1,25 +1,13 @@
-import EntranceShuffle
-import re
+import EntranceIndex
 
+# Where the grottos with these entrance ids lead
 def allGrottoRegionsWithTypes(types):
-    grottos = filter(lambda x: x[0] == 'Grotto', EntranceShuffle.entrance_shuffle_table)
-
-    results = []
-    for x in filter(lambda x: x[1][1]['entrance'] in types, grottos):
-        match = re.fullmatch("(.*) -> (.*)", x[1][0])
-        assert match
-        results.append(match.group(2))
-    return results
+    index = EntranceIndex.getIndex()
+    return [index.destination(name) for name in index.namesOfTypes(['Grotto'], 1) if index.data(name)['entrance'] in types]
 
 def allGreatFairyFountains():
-    interiors = filter(lambda x: x[0] == 'Interior', EntranceShuffle.entrance_shuffle_table)
-
-    results = []
-    for x in filter(lambda x: "Great Fairy Fountain" in x[1][0], interiors):
-        match = re.fullmatch("(.*) -> (.*)", x[1][0])
-        assert match
-        results.append(match.group(2))
-    return results
+    index = EntranceIndex.getIndex()
+    return [index.destination(name) for name in index.namesOfTypes(['Interior'], 1) if "Great Fairy Fountain" in name]
 
 combine_scrub_numbers = False
 class AutoGrotto:
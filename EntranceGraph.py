@@ -0,0 +1,138 @@
+from RegionGraph import getRegionGraph
+
+# What the tracker knows about each exit, kept in arrays indexed by the RegionGraph exit numbers
+# instead of in attributes patched onto OoTR's exits
+# Everything that connects, reshuffles or resets an exit goes through here, so that the indexes built on the
+# arrays (what leads into each region, which exits are consumed, the RegionGraph destinations) stay up to date
+# without scanning the world. The exits' own shuffled and connected_region are kept in step, since OoTR reads them.
+class EntranceGraph:
+    def __init__(self, world):
+        self.world = world
+        self.region_graph = getRegionGraph(world)
+        self.exits = self.region_graph.exits
+        self.exit_ids = self.region_graph.exit_ids
+        self.ids = {exit.name: i for i, exit in enumerate(self.exits)}
+        count = len(self.exits)
+        self.shuffled = bytearray(exit.shuffled for exit in self.exits)
+        # Known: the user has told us where a shuffled exit leads
+        self.known = bytearray(count)
+        # Set by the solver for the shuffled exits that can be reached
+        self.please_explore = bytearray(count)
+        # The exit whose destination a known exit took (-1 if none), and how many known exits took each exit's
+        self.consumed_exit = [-1] * count
+        self.consumed = [0] * count
+        # The other half of a coupled pair of known exits, or -1
+        self.coupled_exit = [-1] * count
+        # The candidate pool that each exit picks its destination from (see ExploreLogic), or None
+        self.pools = [None] * count
+        # The unshuffled exits leading into each region
+        self.incoming = {}
+        for exit_id, exit in enumerate(self.exits):
+            if not exit.shuffled:
+                self.incoming.setdefault(exit.connected_region, set()).add(exit_id)
+        # Exits that have been consumed or given back, and regions that something has started or stopped leading to,
+        # since the last takeChanges()
+        self.changed_exits = set()
+        self.changed_regions = set()
+
+    def id(self, name):
+        return self.ids[name]
+
+    def exit(self, name):
+        return self.exits[self.ids[name]]
+
+    def isConsumed(self, exit_id):
+        return self.consumed[exit_id] > 0
+
+    def regionIsConnected(self, region):
+        return len(self.incoming.get(region, ())) > 0
+
+    # Every change to whether an exit is shuffled, or where it leads, goes through here
+    def setConnection(self, exit_id, shuffled, connected_region):
+        exit = self.exits[exit_id]
+        if not exit.shuffled:
+            leading_here = self.incoming[exit.connected_region]
+            leading_here.discard(exit_id)
+            if not leading_here:
+                self.changed_regions.add(exit.connected_region)
+        exit.shuffled = shuffled
+        exit.connected_region = connected_region
+        self.shuffled[exit_id] = shuffled
+        if not shuffled:
+            leading_here = self.incoming.setdefault(connected_region, set())
+            if not leading_here:
+                self.changed_regions.add(connected_region)
+            leading_here.add(exit_id)
+        self.region_graph.refresh_exit(exit)
+
+    def setConsumedExit(self, exit_id, consumed_id):
+        old_id = self.consumed_exit[exit_id]
+        if old_id >= 0:
+            self.consumed[old_id] -= 1
+            if not self.consumed[old_id]:
+                self.changed_exits.add(old_id)
+        self.consumed_exit[exit_id] = consumed_id
+        if consumed_id >= 0:
+            if not self.consumed[consumed_id]:
+                self.changed_exits.add(consumed_id)
+            self.consumed[consumed_id] += 1
+
+    # The user has found where a shuffled exit leads, which uses up consumed_id's destination (if not -1)
+    def connect(self, exit_id, connected_region, consumed_id=-1, coupled_id=-1):
+        self.setConnection(exit_id, False, connected_region)
+        self.known[exit_id] = 1
+        self.please_explore[exit_id] = 0
+        self.setConsumedExit(exit_id, consumed_id)
+        self.coupled_exit[exit_id] = coupled_id
+
+    # Forget where a known exit leads
+    # Returns the exit it was coupled with (which is left connected, but no longer coupled), or -1
+    def disconnect(self, exit_id):
+        self.setConnection(exit_id, True, None)
+        self.known[exit_id] = 0
+        self.please_explore[exit_id] = 0
+        self.setConsumedExit(exit_id, -1)
+        coupled_id = self.coupled_exit[exit_id]
+        if coupled_id >= 0:
+            self.coupled_exit[exit_id] = -1
+            self.coupled_exit[coupled_id] = -1
+        return coupled_id
+
+    # Put an exit back the way the world was generated, forgetting anything known about it
+    def restore(self, exit_id):
+        exit = self.exits[exit_id]
+        self.setConnection(exit_id, False, exit.name.split(" -> ")[1])
+        self.known[exit_id] = 0
+        self.please_explore[exit_id] = 0
+        self.setConsumedExit(exit_id, -1)
+        self.coupled_exit[exit_id] = -1
+
+    # Mark an exit shuffled, with its vanilla destination left in place as OoTR does
+    def shuffle(self, exit_id):
+        self.setConnection(exit_id, True, self.exits[exit_id].connected_region)
+
+    # Hand over the exits and regions changed since the last call, and start collecting again
+    def takeChanges(self):
+        changed_exits, changed_regions = self.changed_exits, self.changed_regions
+        self.changed_exits = set()
+        self.changed_regions = set()
+        return changed_exits, changed_regions
+
+    def clearExplore(self):
+        self.please_explore[:] = bytes(len(self.please_explore))
+
+    def exploreNames(self):
+        return [exit.name for exit, flag in zip(self.exits, self.please_explore) if flag]
+
+    def setExploreNames(self, names):
+        self.clearExplore()
+        for name in names:
+            self.please_explore[self.ids[name]] = 1
+
+# The graph for this world, made on first use (and again if the RegionGraph it numbers its exits by is replaced)
+def getEntranceGraph(world):
+    graph = getattr(world, 'entrance_graph', None)
+    if graph is None or graph.region_graph is not getRegionGraph(world):
+        graph = EntranceGraph(world)
+        world.entrance_graph = graph
+    return graph
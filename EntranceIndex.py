@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+
+import WorldSnapshot
+
+# Bump this when the layout of the index file changes
+INDEX_VERSION = 1
+
+# The OoTR entrance shuffle table, looked up by exit name and by type instead of scanned
+# Each table row is (type, (forward exit, data), optionally (return exit, data))
+# The index is saved next to the world snapshots, so that later sessions don't even have to import EntranceShuffle
+class EntranceIndex:
+    def __init__(self, entries):
+        # [type, forward exit, return exit or None] in table order
+        self.entries = entries
+        self.exits = {}
+        self.by_type = {}
+        for row, (type, forward, back) in enumerate(entries):
+            self.by_type.setdefault(type, []).append((row, forward, back))
+            for name, pair in [(forward, back), (back, forward)]:
+                if name is None:
+                    continue
+                source, destination = name.split(" -> ")
+                self.exits[name] = {'type': type, 'pair': pair, 'source': source, 'destination': destination}
+
+    @classmethod
+    def fromTable(cls, table):
+        entries = [[x[0], x[1][0], x[2][0] if len(x) > 2 else None] for x in table]
+        index = cls(entries)
+        for x in table:
+            for name, data in x[1:]:
+                index.exits[name]['data'] = data
+        return index
+
+    def toJson(self):
+        return {'entries': self.entries, 'data': {name: exit.get('data', {}) for name, exit in self.exits.items()}}
+
+    @classmethod
+    def fromJson(cls, data):
+        index = cls(data['entries'])
+        for name, exit_data in data['data'].items():
+            index.exits[name]['data'] = exit_data
+        return index
+
+    # The other exit of a pair in the table
+    def opposite(self, name):
+        exit = self.exits.get(name)
+        if exit is None or exit['pair'] is None:
+            raise Exception("Opposite exit not found!")
+        return exit['pair']
+
+    def source(self, name):
+        return self.exits[name]['source']
+
+    def destination(self, name):
+        return self.exits[name]['destination']
+
+    def type(self, name):
+        return self.exits[name]['type']
+
+    def data(self, name):
+        return self.exits[name]['data']
+
+    # (forward exit, return exit or None) for every table row of these types, in table order
+    def entriesOfTypes(self, types):
+        rows = sorted(x for type in set(types) for x in self.by_type.get(type, []))
+        return [(forward, back) for _, forward, back in rows]
+
+    # The forward (n=1) or return (n=2) exits of these types, in table order
+    def namesOfTypes(self, types, n):
+        return [pair[n - 1] for pair in self.entriesOfTypes(types) if pair[n - 1] is not None]
+
+    # Where the forward and return exits of these types lead
+    def destinationsOfTypes(self, types):
+        return [self.destination(name) for pair in self.entriesOfTypes(types) for name in pair if name is not None]
+
+index = None
+
+def indexFilename():
+    if WorldSnapshot.snapshot_dir is None:
+        return None
+    return os.path.join(WorldSnapshot.snapshot_dir, 'entrance_index.json')
+
+# The index for this OoTR revision, loaded from disk or built from EntranceShuffle the first time
+def getIndex():
+    global index
+    if index is None:
+        index = load()
+    if index is None:
+        import EntranceShuffle
+        index = EntranceIndex.fromTable(EntranceShuffle.entrance_shuffle_table)
+        save(index)
+    return index
+
+def load():
+    filename = indexFilename()
+    if filename is None or not os.path.exists(filename):
+        return None
+    try:
+        with open(filename, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning("Ignoring unreadable entrance index {}: {}".format(filename, e))
+        return None
+    if data.get('version') != INDEX_VERSION or data.get('ootr') != WorldSnapshot.ootrRevision():
+        return None
+    return EntranceIndex.fromJson(data)
+
+def save(index):
+    filename = indexFilename()
+    if filename is None:
+        return
+    data = index.toJson()
+    data['version'] = INDEX_VERSION
+    data['ootr'] = WorldSnapshot.ootrRevision()
+    try:
+        text = json.dumps(data)
+        os.makedirs(WorldSnapshot.snapshot_dir, exist_ok=True)
+        with open(filename, "w") as f:
+            f.write(text)
+    except (OSError, TypeError) as e:
+        logging.warning("Couldn't save the entrance index: {}".format(e))
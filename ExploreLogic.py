@@ -0,0 +1,508 @@
+import HoodTracker
+import EntranceIndex
+import AutoGrotto
+from EntranceGraph import getEntranceGraph
+import bisect
+import logging
+import re
+from collections import Counter
+
+# Break the exit name into [ source_name, dest_name ]
+def parseExitName(name):
+    match = re.fullmatch("(.*) -> (.*)", name)
+    assert match
+    return [match.group(1), match.group(2)]
+
+def getDestinationsOfTypes(types):
+    return EntranceIndex.getIndex().destinationsOfTypes(types)
+
+# Find the opposite exit of the pairs defined by the EntranceShuffleTable
+def getOppositeExitName(name):
+    return EntranceIndex.getIndex().opposite(name)
+
+# The obvious place for an exit to lead would be the source region of its paired exit
+# But this breaks the logic of some exits with special logic, e.g. LW Bridge From Forest,
+# Colossus from Spirit Temple, and DMC
+# The solution is to lead to the DESTINATION region of the OPPOSITE exit according to the EntranceShuffleTable
+def getDestinationForPairedExit(paired_exit_name):
+    return EntranceIndex.getIndex().destination(getOppositeExitName(paired_exit_name))
+
+owl_destinations = set(getDestinationsOfTypes(['WarpSong', 'OwlDrop', 'Overworld', 'Extra']))
+spawn_warp_destinations = set(getDestinationsOfTypes(['Spawn', 'WarpSong', 'OwlDrop', 'Overworld', 'Interior', 'SpecialInterior', 'Extra']))
+
+substitute_regions = {}
+substitute_regions['Auto Generic Grotto'] = AutoGrotto.allGrottoRegionsWithTypes([0x3f])
+if AutoGrotto.combine_scrub_numbers:
+    substitute_regions['Auto Scrub Grotto'] = AutoGrotto.allGrottoRegionsWithTypes([0x5a4, 0x5bc, 0x5b0, 0x59c])
+else:
+    substitute_regions['Auto 1-Scrub Grotto'] = AutoGrotto.allGrottoRegionsWithTypes([0x59c])
+    substitute_regions['Auto 2-Scrub Grotto'] = AutoGrotto.allGrottoRegionsWithTypes([0x5b0, 0x5bc])
+    substitute_regions['Auto 3-Scrub Grotto'] = AutoGrotto.allGrottoRegionsWithTypes([0x5a4])
+substitute_regions['Auto Fairy Fountain'] = AutoGrotto.allGrottoRegionsWithTypes([0x036D])
+substitute_regions['Auto Great Fairy Fountain'] = AutoGrotto.allGreatFairyFountains()
+
+def attemptLookup(name, dictionary):
+    if name in dictionary:
+        return dictionary[name]
+    return name
+
+# Finds names by the start of their words, so that "gre fou" finds Great Fairy Fountain
+class NameIndex:
+    def __init__(self, names):
+        self.prefixes = {}
+        for name in names:
+            for word in re.findall(r"\w+", name.lower()):
+                for n in range(1, len(word) + 1):
+                    self.prefixes.setdefault(word[:n], set()).add(name)
+
+    # The names with a word starting with each typed word, or None if nothing has been typed
+    def matching(self, text):
+        result = None
+        for word in re.findall(r"\w+", text.lower()):
+            names = self.prefixes.get(word, set())
+            result = names if result is None else result & names
+        return result
+
+# The substitute keyword for each region that has one
+substitute_types = {}
+for type, regions in substitute_regions.items():
+    for region in regions:
+        substitute_types.setdefault(region, type)
+
+def substituteType(name):
+    return substitute_types.get(name)
+
+# The names that the unknown exits of one pool can be set to
+# Entries are exits (or destination region names, for owls and warps), each shown under one name while it is available;
+# the names are kept in sorted order as entries come and go, so listing them needs no sorting or reformatting
+class CandidatePool:
+    def __init__(self, entries):
+        self.entries = entries
+        self.shown_as = {}
+        self.counts = Counter()
+        # Every name shown so far, sorted; the ones with no entries left are skipped when listing
+        self.sorted_names = []
+
+    # Show an entry under this name, or take it out of the pool with None
+    def show(self, entry, name):
+        old_name = self.shown_as.get(entry)
+        if old_name == name:
+            return
+        if old_name is not None:
+            self.counts[old_name] -= 1
+            del self.shown_as[entry]
+        if name is not None:
+            if name not in self.counts:
+                bisect.insort(self.sorted_names, name)
+            self.counts[name] += 1
+            self.shown_as[entry] = name
+
+    # The names in the pool, in order, leaving out the one entry that is excluded (if it is there at all)
+    def candidates(self, excluded=None):
+        excluded_name = self.shown_as.get(excluded)
+        result = []
+        for name in self.sorted_names:
+            count = self.counts[name]
+            if name == excluded_name:
+                count -= 1
+            if count > 0:
+                result.append(name)
+        return result
+
+# The entrance shuffle rules behind the explore panel: which exits are in which pool, and what each unknown exit could lead to
+# The state of each exit (known, consumed, coupled) is kept in the world's EntranceGraph
+# There is no Qt in here, so it can also be used headless
+class ExploreLogic:
+    def __init__(self, world, input_data):
+        self.set_up_world(world, input_data)
+
+    def getPossibilities(self, exit_name):
+        entrances = self.entrances
+        exit_id = entrances.id(exit_name)
+        assert entrances.shuffled[exit_id]
+
+        # Find the list of possible destinations based on rules for various types of exit
+        self.update_candidates()
+        pool = entrances.pools[exit_id]
+        if pool is self.owl_pool or pool is self.spawn_warp_pool:
+            return pool.candidates()
+        opposite_exit = entrances.exit(getOppositeExitName(exit_name))
+        if getattr(self.world.settings, 'mix_entrance_pools', 'off') != 'off':
+            return self.mixed_pool.candidates(excluded=opposite_exit)
+        return pool.candidates(excluded=opposite_exit)
+
+    # The possibilities for an exit that match what has been typed so far, in the same order
+    def filterPossibilities(self, possibilities, text):
+        if self.name_index is None:
+            names = set()
+            for label, substitute in self.candidate_labels.values():
+                names.add(label)
+                if substitute is not None:
+                    names.add(substitute)
+            self.name_index = NameIndex(names)
+        matches = self.name_index.matching(text)
+        if matches is None:
+            return possibilities
+        return [x for x in possibilities if x in matches]
+
+    # What a destination is shown as in the explore panel:
+    # a region with only one entrance is shown by its name, other exits are shown as Y (from X),
+    # and regions with an automatic substitute keyword are shown as that until something leads there
+    def candidateName(self, entry):
+        label, substitute = self.candidate_labels[entry]
+        if substitute is None or self.entrances.regionIsConnected(label):
+            return label
+        return substitute
+
+    # (name, substitute keyword or None) for a pool entry, worked out once per world
+    def candidateLabel(self, entry):
+        name = str(entry)
+        if " -> " not in name:
+            return (name, substituteType(name))
+        if name in self.oneentrance_to_region:
+            region = self.oneentrance_to_region[name]
+            return (region, substituteType(region))
+        source, dest = parseExitName(name)
+        return ("{} (from {})".format(dest, source), None)
+
+    # Show a pool entry under its current name in each pool it is in, or take it out of them while it is consumed
+    def showEntry(self, entry):
+        exit_id = self.entrances.exit_ids.get(entry)
+        if exit_id is not None and self.entrances.isConsumed(exit_id):
+            name = None
+        else:
+            name = self.candidateName(entry)
+        for pool in self.entry_pools[entry]:
+            pool.show(entry, name)
+
+    # Bring the pools up to date with the exits consumed or given back, and the regions that something has started
+    # or stopped leading to, since the last update
+    def update_candidates(self):
+        changed_exits, changed_regions = self.entrances.takeChanges()
+        entries = set()
+        for exit_id in changed_exits:
+            exit = self.entrances.exits[exit_id]
+            if exit in self.entry_pools:
+                entries.add(exit)
+        for region in changed_regions:
+            type = substituteType(region)
+            if type is None:
+                continue
+            connected = self.regionIsConnected(region)
+            if connected and region in self.free_substitute_regions:
+                self.free_substitute_regions.remove(region)
+                self.free_substitutes[type] -= 1
+            elif not connected and region not in self.free_substitute_regions:
+                self.free_substitute_regions.add(region)
+                self.free_substitutes[type] += 1
+            entries.update(self.substitute_entries.get(region, ()))
+        for entry in entries:
+            self.showEntry(entry)
+
+    def regionIsConnected(self, region):
+        return self.entrances.regionIsConnected(region)
+
+    # Raises ValueError, before connecting anything, if the destination can't be where this exit leads
+    # (the names can come from outside the tracker, e.g. a spoiler log)
+    def setKnownExit(self, exit, destination_name):
+        entrances = self.entrances
+        if exit not in entrances.ids:
+            raise ValueError("There is no exit {}".format(exit))
+        exit_id = entrances.id(exit)
+        if not entrances.shuffled[exit_id]:
+            raise ValueError("{} is not an unknown shuffled exit".format(exit))
+        self.update_candidates()
+
+        # For automatic substitute names, find a region that is not connected to ANYTHING
+        # (other than the one this exit leaves, which would make it its own way back)
+        # update_candidates() has just brought the free regions of each type up to date
+        if destination_name in self.backwards_substitute:
+            source = entrances.exits[exit_id].parent_region.name
+            found = None
+            if self.free_substitutes[destination_name]:
+                for possible_dest in self.backwards_substitute[destination_name]:
+                    if possible_dest != source and possible_dest in self.free_substitute_regions:
+                        found = possible_dest
+                        break
+            if found is None:
+                raise ValueError("Every {} is already connected".format(destination_name))
+            if found != destination_name:
+                logging.info("Auto-substitute chose {} for {}".format(found, destination_name))
+                destination_name = found
+
+        # Sanity checks based on what kind of connection this is
+        pool = entrances.pools[exit_id]
+        if pool is self.owl_pool:
+            if destination_name not in owl_destinations:
+                raise ValueError("{} can't lead to {}".format(exit, destination_name))
+            self.makeConnection(exit_id, destination_name)
+        elif pool is self.spawn_warp_pool:
+            if destination_name not in spawn_warp_destinations:
+                raise ValueError("{} can't lead to {}".format(exit, destination_name))
+            self.makeConnection(exit_id, destination_name)
+        else:
+            # Either the destination is one word, which came from the oneentrance table
+            # Or it's been turned into the form X (from Y)
+            # Either way, we just need a destination name and a consumed exit from it
+            if destination_name in self.region_to_oneentrance:
+                exit_name = self.region_to_oneentrance[destination_name]
+                destination_name = parseExitName(exit_name)[1]
+            else:
+                match = re.fullmatch(r"(.+) \(from (.+)\)", destination_name)
+                if not match:
+                    raise ValueError("{} is not a destination".format(destination_name))
+                destination_name = match.group(1)
+                exit_name = "{} -> {}".format(match.group(2), match.group(1))
+            consumed_id = self.unconsumedExit(exit_name)
+
+            if getattr(self.world.settings, 'decouple_entrances', False):
+                self.makeConnection(exit_id, destination_name, consumed_id=consumed_id)
+            else:
+                # The decoupled pattern is: (exit a->b) consumed (exit c->d) and goes to d
+                # If it's coupled, then the reverse path is: (exit d->c) consumed (exit b->a) and goes to a
+                # B and C are irrelevant except to know which doorway it is, but make sure that c->d and b->a are consumed
+                #
+                # There is enough info if we say that (exit a->b) is paired with (exit d->c),
+                # and this is symmetrical to save in text (i.e. (d->c) pairswith (a->b) is the same)
+                # So we will follow this in code too
+                paired_id = self.oppositeExit(exit_name)
+                if paired_id == exit_id or not entrances.shuffled[paired_id]:
+                    raise ValueError("{} can't lead to {}: its way back is already known, or is this exit itself".format(exit, destination_name))
+                self.unconsumedExit(entrances.exits[self.oppositeExit(exit)].name)
+                self.makeCoupledConnection(exit_id, paired_id)
+
+    # The id of an exit whose destination can still be taken, or ValueError
+    def unconsumedExit(self, exit_name):
+        exit_id = self.entrances.ids.get(exit_name)
+        if exit_id is None:
+            raise ValueError("There is no exit {}".format(exit_name))
+        if self.entrances.isConsumed(exit_id):
+            raise ValueError("Something already leads to where {} goes".format(exit_name))
+        return exit_id
+
+    def oppositeExit(self, exit_name):
+        try:
+            return self.entrances.id(getOppositeExitName(exit_name))
+        except Exception:
+            raise ValueError("{} has no way back".format(exit_name))
+
+    # Make a single connection
+    def makeConnection(self, exit_id, destination_name, redundant_okay=False, consumed_id=-1):
+        entrances = self.entrances
+        exit = entrances.exits[exit_id]
+        if not exit.shuffled:
+            assert redundant_okay
+            assert exit.connected_region == destination_name
+            return
+        if consumed_id >= 0:
+            logging.info("Consuming exit {} for this".format(entrances.exits[consumed_id]))
+        entrances.connect(exit_id, destination_name, consumed_id=consumed_id)
+        if exit_id in self.boss_doors:
+            # Mark the boss room hint once we've connected it to a dungeon
+            other_exit = entrances.exit(destination_name)
+            other_exit.parent_region.dungeon = exit.parent_region.dungeon
+
+    def makeCoupledConnection(self, exit1, exit2):
+        entrances = self.entrances
+        exit_ids = [exit1, exit2]
+        consumed_ids = [entrances.id(getOppositeExitName(entrances.exits[x].name)) for x in exit_ids]
+        for i, x in enumerate(exit_ids):
+            other_index = (i+1)%2
+            other_id = exit_ids[other_index]
+            consumed_id = consumed_ids[other_index]
+            if x in self.boss_doors:
+                # Mark the boss room hint once we've connected it to a dungeon
+                entrances.exits[other_id].parent_region.dungeon = entrances.exits[x].parent_region.dungeon
+            # Destination = destination of the consumed exit
+            # (but use the name, i.e. the canonical destination, not the struct)
+            match = re.match("(.+) -> (.+)", entrances.exits[consumed_id].name)
+            assert match
+            entrances.connect(x, match.group(2), consumed_id=consumed_id, coupled_id=other_id)
+
+    # Returns the substitute name for a region
+    # If the world is supplied and the world has an entrance leading to this region already, don't substitute it
+    def substitute_helper(self, name, world=None):
+        type = substituteType(name)
+        if type is None:
+            return name
+        if world is not None and self.regionIsConnected(name):
+            return name
+        return type
+    # Called from the HoodTrackerGui for each exit that we unlink
+    def reshuffle_exit(self, exit_name):
+        entrances = self.entrances
+        exit_id = entrances.id(exit_name)
+
+        assert not entrances.shuffled[exit_id]
+
+        region = self.world.get_region(entrances.exits[exit_id].connected_region)
+        if 'Boss Room' in region.name:
+            # No more dungeon hint for an unconnected boss room
+            region.dungeon = None
+        coupled_id = entrances.disconnect(exit_id)
+        if coupled_id >= 0:
+            self.reshuffle_exit(entrances.exits[coupled_id].name)
+
+    def input_saved_data(self, input_data):
+        # Get the shuffled exits according to the world settings
+        # so that we can ignore/discard anything that isn't shuffled
+        shuffled_exits = HoodTracker.get_shuffled_exits(self.world.settings)
+        discard = []
+
+        for line in input_data['known_exits']:
+            match = re.match("(.+) goesto (.+) \(Consumes (.+)\)", line)
+            if match:
+                exit, destination_region, consumed_exit = match.groups()
+                consumed_id = self.entrances.id(consumed_exit)
+            else:
+                match = re.match("(.+) goesto (.+)", line)
+                assert match
+                exit, destination_region = match.groups()
+                consumed_id = -1
+            if exit not in shuffled_exits:
+                # A shuffled exit is not un-shuffled due to settings change
+                discard.append(line)
+                continue
+            self.makeConnection(self.entrances.id(exit), destination_region, consumed_id=consumed_id, redundant_okay=True)
+        for line in discard:
+            input_data['known_exits'].remove(line)
+
+        discard = []
+        for line in input_data['paired_exits']:
+            match = re.match("(.*) pairswith (.*)", line)
+            assert match
+            exit1, exit2 = match.groups()
+            if not exit1 in shuffled_exits:
+                # A shuffled exit is not un-shuffled due to settings change
+                assert exit2 not in shuffled_exits
+                discard.append(line)
+                continue
+            self.makeCoupledConnection(self.entrances.id(exit1), self.entrances.id(exit2))
+        for line in discard:
+            input_data['paired_exits'].remove(line)
+
+    def get_output(self):
+        entrances = self.entrances
+        output_known_exits = []
+        output_known_paired_exits = []
+        do_these = [x for x in self.all_shuffled_ids if entrances.known[x]]
+        while len(do_these):
+            exit_id = do_these.pop()
+            exit = entrances.exits[exit_id]
+            assert not exit.shuffled
+            coupled_id = entrances.coupled_exit[exit_id]
+            if coupled_id < 0:
+                consumed_id = entrances.consumed_exit[exit_id]
+                if consumed_id < 0:
+                    output_known_exits.append("{} goesto {}".format(exit, exit.connected_region))
+                else:
+                    output_known_exits.append("{} goesto {} (Consumes {})".format(exit, exit.connected_region, entrances.exits[consumed_id]))
+            else:
+                output_known_paired_exits.append("{} pairswith {}".format(exit, entrances.exits[coupled_id]))
+                do_these.remove(coupled_id)
+        return output_known_exits, output_known_paired_exits
+
+    def set_up_world(self, world, input_data):
+        self.world = world
+        self.entrances = entrances = getEntranceGraph(world)
+        assert len(entrances.ids) == len(entrances.exits)
+        all_exits = entrances.exits
+        all_destination_names = set(x.parent_region.name for x in all_exits)
+
+        index = EntranceIndex.getIndex()
+        self.overworld_to_interior = [entrances.exit(name) for name in index.namesOfTypes(('Interior', 'SpecialInterior'), 1)]
+        self.interior_to_overworld = [entrances.exit(name) for name in index.namesOfTypes(('Interior', 'SpecialInterior'), 2)]
+
+        overworld_to_overworld_names = []
+        for forward, back in index.entriesOfTypes(['Overworld']):
+            if back is None and not getattr(self.world.settings, 'decouple_entrances', False):
+                # The GV Lower Stream -> Lake Hylia exit is not shuffled if decoupled entrances is off
+                continue
+            overworld_to_overworld_names.extend(x for x in (forward, back) if x is not None)
+        self.overworld_to_overworld = [entrances.exit(name) for name in overworld_to_overworld_names]
+
+        self.overworld_to_grotto = [entrances.exit(name) for name in index.namesOfTypes(('Grotto', 'Grave', 'SpecialGrave'), 1)]
+        self.grotto_to_overworld = [entrances.exit(name) for name in index.namesOfTypes(('Grotto', 'Grave', 'SpecialGrave'), 2)]
+
+        self.overworld_to_dungeon = [entrances.exit(name) for name in index.namesOfTypes(['Dungeon', 'DungeonSpecial'], 1)]
+        self.dungeon_to_overworld = [entrances.exit(name) for name in index.namesOfTypes(['Dungeon', 'DungeonSpecial'], 2)]
+
+        self.boss_door_to_room = [entrances.exit(name) for name in index.namesOfTypes(['ChildBoss', 'AdultBoss'], 1)]
+        self.boss_room_to_door = [entrances.exit(name) for name in index.namesOfTypes(['ChildBoss', 'AdultBoss'], 2)]
+
+        owl_flight_names = set(index.namesOfTypes(['OwlDrop'], 1))
+        self.owl_flight = [x for x in all_exits if x.name in owl_flight_names]
+
+        spawn_warp_names = set(index.namesOfTypes(['WarpSong', 'Spawn'], 1))
+        self.spawn_warp_exits = [x for x in all_exits if x.name in spawn_warp_names]
+
+        self.all_shuffled_exits = self.overworld_to_interior + self.interior_to_overworld + self.overworld_to_overworld + self.overworld_to_grotto + self.grotto_to_overworld + self.overworld_to_dungeon + self.dungeon_to_overworld + self.owl_flight + self.spawn_warp_exits + self.boss_door_to_room + self.boss_room_to_door
+        self.nonwarp_shuffled_exits = self.overworld_to_interior + self.interior_to_overworld + self.overworld_to_overworld + self.overworld_to_grotto + self.grotto_to_overworld + self.overworld_to_dungeon + self.dungeon_to_overworld
+        self.type_lists = [self.overworld_to_overworld,
+                           self.overworld_to_grotto,
+                           self.grotto_to_overworld,
+                           self.overworld_to_dungeon,
+                           self.dungeon_to_overworld,
+                           self.overworld_to_interior,
+                           self.interior_to_overworld,
+                           self.boss_door_to_room,]
+        self.all_shuffled_ids = [entrances.exit_ids[x] for x in self.all_shuffled_exits]
+        self.boss_doors = set(entrances.exit_ids[x] for x in self.boss_door_to_room)
+
+        # substitute_helper() does a lookup from exit name -> auto name
+        # save this in backwards form
+        self.backwards_substitute = {}
+        for destination in all_destination_names:
+            sub_name = self.substitute_helper(destination)
+            if sub_name == destination:
+                continue
+            if sub_name not in self.backwards_substitute:
+                self.backwards_substitute[sub_name] = []
+            self.backwards_substitute[sub_name].append(destination)
+
+        one_entrance_places = self.overworld_to_grotto + self.overworld_to_interior + self.overworld_to_dungeon
+        self.region_to_oneentrance = {}
+        self.oneentrance_to_region = {}
+        for exit in one_entrance_places:
+            exit_name = str(exit)
+            source, dest = exit_name.split(" -> ")
+            self.region_to_oneentrance[dest] = exit_name
+            self.oneentrance_to_region[exit_name] = dest
+
+        # How many regions of each substitute type nothing leads to yet
+        entrances.takeChanges()
+        self.free_substitute_regions = set(region for region in substitute_types if not self.regionIsConnected(region))
+        self.free_substitutes = Counter(substitute_types[region] for region in self.free_substitute_regions)
+
+        # The candidates for each kind of unknown exit, which update_candidates() keeps up to date
+        # Each exit's pool is kept in the EntranceGraph, so that finding it is a lookup
+        self.owl_pool = CandidatePool(sorted(owl_destinations))
+        self.spawn_warp_pool = CandidatePool(sorted(spawn_warp_destinations))
+        self.mixed_pool = CandidatePool(self.nonwarp_shuffled_exits)
+        self.candidate_pools = [self.owl_pool, self.spawn_warp_pool, self.mixed_pool] + [CandidatePool(x) for x in self.type_lists if x]
+        entrances.pools = [None] * len(entrances.exits)
+        for exit in self.owl_flight:
+            entrances.pools[entrances.exit_ids[exit]] = self.owl_pool
+        for exit in self.spawn_warp_exits:
+            entrances.pools[entrances.exit_ids[exit]] = self.spawn_warp_pool
+        for pool in self.candidate_pools[3:]:
+            for exit in pool.entries:
+                entrances.pools[entrances.exit_ids[exit]] = pool
+
+        # The pools each entry is in, and the entries that are shown by a substitute keyword until something leads to their region
+        self.candidate_labels = {}
+        self.entry_pools = {}
+        self.substitute_entries = {}
+        for pool in self.candidate_pools:
+            for entry in pool.entries:
+                if entry not in self.candidate_labels:
+                    label, substitute = self.candidate_labels[entry] = self.candidateLabel(entry)
+                    if substitute is not None:
+                        self.substitute_entries.setdefault(label, []).append(entry)
+                self.entry_pools.setdefault(entry, []).append(pool)
+        for entry in self.entry_pools:
+            self.showEntry(entry)
+        # Made the first time a destination picker is typed in
+        self.name_index = None
+
+        self.input_saved_data(input_data)
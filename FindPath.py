@@ -1,6 +1,5 @@
 import HoodTracker
 from CommonUtils import *
-import PySide2.QtWidgets as QtWidgets
 
 class Visit:
     def __init__(self, age, region, steps, string, previous):
@@ -19,8 +18,7 @@ class Visit:
 
 def findPath(world, equipment, start_region, start_age, destination, destination_ages=['adult' , 'child'], reboot_as_last_resort=True):
     # To traverse the world, we need drop and event items, so run a full solve step to get those
-    world.state.prog_items = equipment
-    HoodTracker.solve(world)
+    HoodTracker.solve(world, equipment)
 
     # Keep tuples of region,age that have been visited
     already_visited = {'child':set(), 'adult':set()}
@@ -91,99 +89,3 @@ def findPath(world, equipment, start_region, start_age, destination, destination
 
     # We have looped through all possible routes
     return None
-
-class FindPathDialog(QtWidgets.QDialog):
-    def __init__(self, all_regions, parent):
-        super().__init__()
-
-        self.parent = parent
-
-        all_regions.sort(key=str.casefold)
-        self.setWindowTitle("Find Path")
-        layout = QtWidgets.QVBoxLayout()
-
-        # Start widgets
-        start_label = QtWidgets.QLabel("Current region:")
-        self.start_combobox = QtWidgets.QComboBox()
-        for x in all_regions:
-            self.start_combobox.addItem(x)
-        start_age_label = QtWidgets.QLabel("Current age:")
-        self.start_age_combobox = QtWidgets.QComboBox()
-        self.start_age_combobox.addItem("child")
-        self.start_age_combobox.addItem("adult")
-
-        # End widgets
-        end_label = QtWidgets.QLabel("Ending region:")
-        self.end_combobox = QtWidgets.QComboBox()
-        for x in all_regions:
-            self.end_combobox.addItem(x)
-        end_age_label = QtWidgets.QLabel("Ending age:")
-        self.end_age_combobox = QtWidgets.QComboBox()
-        self.end_age_combobox.addItem("either")
-        self.end_age_combobox.addItem("child")
-        self.end_age_combobox.addItem("adult")
-
-        # Checkbox
-        self.checkbox = QtWidgets.QCheckBox()
-        check_layout = QtWidgets.QHBoxLayout()
-        check_layout.addWidget(QtWidgets.QLabel("Reboots OK:"))
-        check_layout.addWidget(self.checkbox)
-
-        # 2 rows lots of columns
-        horiz = QtWidgets.QHBoxLayout()
-        col1 = QtWidgets.QVBoxLayout()
-        col1.addWidget(start_label)
-        col1.addWidget(end_label)
-        col2 = QtWidgets.QVBoxLayout()
-        col2.addWidget(self.start_combobox)
-        col2.addWidget(self.end_combobox)
-        col3 = QtWidgets.QVBoxLayout()
-        col3.addWidget(start_age_label)
-        col3.addWidget(end_age_label)
-        col4 = QtWidgets.QVBoxLayout()
-        col4.addWidget(self.start_age_combobox)
-        col4.addWidget(self.end_age_combobox)
-        col5 = QtWidgets.QVBoxLayout()
-        col5.addStretch(1)
-        col5.addLayout(check_layout)
-        horiz.addLayout(col1)
-        horiz.addLayout(col2)
-        horiz.addLayout(col3)
-        horiz.addLayout(col4)
-        horiz.addLayout(col5)
-        layout.addLayout(horiz)
-
-        # Full row button, label, and text box
-        find_button = QtWidgets.QPushButton("Find Route")
-        find_button.clicked.connect(self.findSolution)
-        layout.addWidget(find_button)
-
-        self.solution = QtWidgets.QLabel("Solution:")
-        layout.addWidget(self.solution)
-
-        self.solution_display = QtWidgets.QPlainTextEdit()
-        layout.addWidget(self.solution_display)
-
-        self.setLayout(layout)
-
-    def findSolution(self):
-        both_ages = ['child', 'adult']
-        start_region = self.start_combobox.currentText()
-        start_age = self.start_age_combobox.currentText()
-        dest_region = self.end_combobox.currentText()
-        dest_age_selection = self.end_age_combobox.currentText()
-        if dest_age_selection == "either":
-            dest_ages = both_ages
-        elif dest_age_selection in both_ages:
-            dest_ages = [dest_age_selection]
-        else:
-            raise Exception()
-        reboot_as_last_resort = not self.checkbox.isChecked()
-
-        if start_region == dest_region and start_age in dest_ages:
-            answer = "Already there"
-        else:
-            answer = findPath(self.parent.world, self.parent.world.state.prog_items, start_region, start_age, dest_region, destination_ages=dest_ages, reboot_as_last_resort=reboot_as_last_resort)
-            if answer is None:
-                answer = "Failure"
-        self.solution_display.setPlainText(answer)
@@ -6,28 +6,25 @@ import re
 import argparse
 from CommonUtils import *
 import datetime
+import importlib.util
+from collections import Counter, deque
+from contextlib import nullcontext
 
 # Make OoTR work as a submodule in a dir called ./OoT-Randomizer
-try:
-    from World import World
-except ModuleNotFoundError:
+# Apart from Region, its modules are imported by the functions that use them, so that importing this module stays cheap
+if importlib.util.find_spec('World') is None:
     ootr_path = os.path.join(os.getcwd(), "OoT-Randomizer")
     if ootr_path not in sys.path:
         sys.path.append(ootr_path)
-    from World import World
-from Utils import data_path
-from Dungeon import create_dungeons
-import ItemPool
-import TextSettings
-import EntranceShuffle
-import SettingsList
-from Item import ItemFactory
-from Settings import Settings, ArgumentDefaultsHelpFormatter
 from Region import TimeOfDay
-import gui
-import LocationLogic
-import InventoryManager
-import LocationList
+import TextSettings
+import SolveCache
+import EntranceIndex
+import RuleCompiler
+import WorldSnapshot
+import SolverStats
+from RegionGraph import getRegionGraph, ReachedRegions
+from EntranceGraph import getEntranceGraph
 
 drops_we_are_interested_in = 'Gold Skulltula Token'
 
@@ -35,6 +32,7 @@ class BadSettingsStringException(Exception):
     pass
 
 def validate_settings_string(settings_string):
+    from Settings import Settings
     s = Settings({})
     try:
         s.update_with_settings_string(settings_string)
@@ -43,11 +41,12 @@ def validate_settings_string(settings_string):
     return True
 
 def getSettings(input_data, gui_dialog=None):
+    from Settings import Settings, ArgumentDefaultsHelpFormatter
     parser = argparse.ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter)
 
     parser.add_argument('--settings_string', help='Provide sharable settings using a settings string. This will override all flags that it specifies.')
 
-    args = parser.parse_args()
+    args, _ = parser.parse_known_args()
 
     settings = Settings({})
     settings_string = None
@@ -62,6 +61,7 @@ def getSettings(input_data, gui_dialog=None):
         settings_string = args.settings_string
         logging.info(f"User has provided {settings_string} as the settings string in the arguments")
     elif gui_dialog:
+        import gui
         settings_string = gui.DialogSettingsManager.get_settings_string()
         input_data['settings_string'] = [settings_string]
         logging.info(f"User has input {settings_string} as the settings string")
@@ -77,6 +77,12 @@ def getSettings(input_data, gui_dialog=None):
         raise Exception("Please set starting age to Child or Adult, then try again.")
     return settings
 
+# The rules read each trick as a setting of its own
+def setTrickFlags(settings):
+    import SettingsList
+    for trick in SettingsList.logic_tricks.values():
+        settings.__dict__[trick['name']] = trick['name'] in settings.allowed_tricks
+
 def determine_mq_dungeons(world, input_data):
     # What do we know about MQs? Replace input data if we know for sure, otherwise maintain input data
     if world.settings.mq_dungeons_mode == 'mq' or (world.settings.mq_dungeons_mode == 'count' and world.settings.mq_dungeons_count == 12):
@@ -127,106 +133,239 @@ def determine_empty_dungeons(world, input_data):
 
     world.settings.empty_dungeons_specific = input_data['empty_dungeons'][:]
 
-def generate(input_data, gui_dialog):
+def generate(input_data, gui_dialog, world_id=0):
+    from World import World
+    from Dungeon import create_dungeons
+    import LocationList
+    import LocationLogic
     settings = getSettings(input_data, gui_dialog=gui_dialog)
+    setTrickFlags(settings)
 
-    for trick in SettingsList.logic_tricks.values():
-        settings.__dict__[trick['name']] = trick['name'] in settings.allowed_tricks
+    # In a multiworld seed, each world is generated on its own (see Multiworld)
+    if world_id >= settings.world_count:
+        raise Exception("There is no world {} in a {} world seed".format(world_id + 1, settings.world_count))
+    world = World(world_id, settings, resolveRandomizedSettings=False)
+    world.ensure_tod_access = False
 
-    worlds = []
-    for i in range(0, settings.world_count):
-        worlds.append(World(i, settings, resolveRandomizedSettings=False))
-        worlds[-1].ensure_tod_access = False
+    determine_mq_dungeons(world, input_data)
+    determine_trials(world, input_data)
+    determine_dungeon_shortcuts(world, input_data)
+    determine_empty_dungeons(world, input_data)
 
-    for id, world in enumerate(worlds):
-        determine_mq_dungeons(world, input_data)
-        determine_trials(world, input_data)
-        determine_dungeon_shortcuts(world, input_data)
-        determine_empty_dungeons(world, input_data)
+    # A world already built for these settings and choices is loaded instead of built again
+    snapshot_key = WorldSnapshot.snapshotKey(world)
+    snapshot = WorldSnapshot.load(snapshot_key)
+    if snapshot is not None:
+        setJunkPool(snapshot)
+        return snapshot
 
-        # Compile the json rules based on settings
-        world.ensure_tod_access=True
+    # Rules already compiled for these settings in an earlier session are loaded instead of compiled again
+    world.rule_compiler = RuleCompiler.RuleCompiler(world)
 
-        # Load common json rule files (those used regardless of MQ status)
-        if settings.logic_rules == 'glitched':
-            path = 'Glitched World'
-        else:
-            path = 'World'
-        path = data_path(path)
-
-        for filename in ('Overworld.json', 'Bosses.json'):
-            world.load_regions_from_json(os.path.join(path, filename))
-
-        create_dungeons(world)
-        world.create_internal_locations()
-
-        # Populate drop items
-        drop_locations = list(filter(lambda loc: loc.type == 'Drop', world.get_locations()))
-        for drop_location in drop_locations:
-            world.push_item(drop_location, ItemFactory(drop_location.vanilla_item, world))
-            drop_location.locked = True
-        # Populate fixed location items
-        ItemPool.junk_pool[:] = list(ItemPool.junk_pool_base)
-        if world.settings.junk_ice_traps == 'on':
-            ItemPool.junk_pool.append(('Ice Trap', 10))
-        elif world.settings.junk_ice_traps in ['mayhem', 'onslaught']:
-            ItemPool.junk_pool[:] = [('Ice Trap', 1)]
-        (pool, placed_items) = ItemPool.get_pool_core(world)
-        placed_items_count = {}
-        #world.itempool = ItemFactory(pool, world)
-        placed_locations = list(filter(lambda loc: loc.name in placed_items, world.get_locations()))
-        for location in placed_locations:
-            item = placed_items[location.name]
-            placed_items_count[item] = placed_items_count.get(item, 0) + 1
-            world.push_item(location, ItemFactory(item, world))
-            world.get_location(location).locked = True
-        a = LocationList.location_table
-
-        if settings.empty_dungeons_mode == 'specific':
-            for k,v in LocationList.location_table.items():
-                empty = False
-                for dungeon in settings.empty_dungeons_specific:
-                    if v[5] and dungeon in v[5]:
-                        empty = True
-                        break
-                if empty:
-                    try:
-                        location = world.get_location(k)
-                        world.push_item(location, ItemFactory('Recovery Heart', world))
-                        location.locked = True
-                    except KeyError:
-                        pass
-
-        return world
+    # Compile the json rules based on settings
+    world.ensure_tod_access=True
+
+    # Load common json rule files (those used regardless of MQ status)
+    path = logicPath(settings)
+    for filename in ('Overworld.json', 'Bosses.json'):
+        world.load_regions_from_json(os.path.join(path, filename))
+
+    create_dungeons(world)
+    world.create_internal_locations()
+
+    placeFixedItems(world, world.get_locations())
+    a = LocationList.location_table
+
+    LocationLogic.populateKnownUnshuffled(world)
+
+    # Fix the bug in World.py code
+    max_tokens = 0
+    if world.settings.bridge == 'tokens':
+        max_tokens = max(max_tokens, world.settings.bridge_tokens)
+    if world.settings.lacs_condition == 'tokens':
+        max_tokens = max(max_tokens, world.settings.lacs_tokens)
+    tokens = [50, 40, 30, 20, 10]
+    for t in tokens:
+        if f'Kak {t} Gold Skulltula Reward' not in world.settings.disabled_locations:
+            max_tokens = max(max_tokens, t)
+    world.max_progressions['Gold Skulltula Token'] = max_tokens
+
+    WorldSnapshot.save(world, snapshot_key)
+    return world
+
+# The folder of json rule files for these settings
+def logicPath(settings):
+    from Utils import data_path
+    if settings.logic_rules == 'glitched':
+        return data_path('Glitched World')
+    return data_path('World')
+
+# Populate the items that these locations always have: drops, the item pool's fixed placements, and empty dungeons
+# (Reconfigure uses this too, for the locations of a dungeon that switches between vanilla and MQ)
+def placeFixedItems(world, locations):
+    from Item import ItemFactory
+    import ItemPool
+    import LocationList
+    for drop_location in [loc for loc in locations if loc.type == 'Drop']:
+        world.push_item(drop_location, ItemFactory(drop_location.vanilla_item, world))
+        drop_location.locked = True
+    setJunkPool(world)
+    (pool, placed_items) = ItemPool.get_pool_core(world)
+    for location in [loc for loc in locations if loc.name in placed_items]:
+        world.push_item(location, ItemFactory(placed_items[location.name], world))
+        location.locked = True
+
+    if world.settings.empty_dungeons_mode == 'specific':
+        names = set(loc.name for loc in locations)
+        for k,v in LocationList.location_table.items():
+            if k not in names or not v[5]:
+                continue
+            if any(dungeon in v[5] for dungeon in world.settings.empty_dungeons_specific):
+                location = world.get_location(k)
+                world.push_item(location, ItemFactory('Recovery Heart', world))
+                location.locked = True
+
+# ItemPool keeps the junk pool in a global, which get_pool_core() reads
+def setJunkPool(world):
+    import ItemPool
+    ItemPool.junk_pool[:] = list(ItemPool.junk_pool_base)
+    if world.settings.junk_ice_traps == 'on':
+        ItemPool.junk_pool.append(('Ice Trap', 10))
+    elif world.settings.junk_ice_traps in ['mayhem', 'onslaught']:
+        ItemPool.junk_pool[:] = [('Ice Trap', 1)]
+
+# Stands for "any item at all", for rules that look through the whole inventory
+ANY_ITEM = ('any item',)
+
+# The inventory used while solving
+# It remembers which items have changed (and bumps a version number), and while a rule is being checked it records which items that rule looked at
+class TrackedCounter(Counter):
+    def __init__(self, *args, **kwargs):
+        self.reads = None
+        self.changed = set()
+        self.version = 0
+        super().__init__(*args, **kwargs)
+
+    def __getitem__(self, key):
+        if self.reads is not None:
+            self.reads.add(key)
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        if self.reads is not None:
+            self.reads.add(key)
+        return super().__contains__(key)
+
+    def get(self, key, default=None):
+        if self.reads is not None:
+            self.reads.add(key)
+        return super().get(key, default)
+
+    def __iter__(self):
+        if self.reads is not None:
+            self.reads.add(ANY_ITEM)
+        return super().__iter__()
+
+    def keys(self):
+        if self.reads is not None:
+            self.reads.add(ANY_ITEM)
+        return super().keys()
+
+    def values(self):
+        if self.reads is not None:
+            self.reads.add(ANY_ITEM)
+        return super().values()
+
+    def items(self):
+        if self.reads is not None:
+            self.reads.add(ANY_ITEM)
+        return super().items()
+
+    def __setitem__(self, key, value):
+        self.changed.add(key)
+        self.version += 1
+        super().__setitem__(key, value)
+
+# Record that the rule being checked depends on something other than an item (e.g. which regions an age has reached)
+def noteDependency(state, dependency):
+    reads = getattr(state.prog_items, 'reads', None)
+    if reads is not None:
+        reads.add(dependency)
+
+# Check a rule, and return the result along with every item, event and region reach that it looked at
+def checkRule(spot, state, age):
+    prog_items = state.prog_items
+    prog_items.reads = set()
+    try:
+        return spot.access_rule(state, spot=spot, age=age), prog_items.reads
+    finally:
+        prog_items.reads = None
+
+# Failed exit and location rules, parked under everything that they looked at
+# A rule is only tried again once one of those items, events or region reaches has changed
+class Wakeups:
+    def __init__(self):
+        self.waiting = {}
+
+    def copy(self):
+        other = Wakeups()
+        other.waiting = {dependency: entries.copy() for dependency, entries in self.waiting.items()}
+        return other
+
+    # A failed rule that looked at nothing can never pass, so it is not kept
+    def park(self, entry, dependencies):
+        for dependency in dependencies:
+            if dependency not in self.waiting:
+                self.waiting[dependency] = []
+            self.waiting[dependency].append(entry)
+
+    def wake(self, dependencies):
+        woken = set()
+        for dependency in dependencies:
+            woken.update(self.waiting.pop(dependency, []))
+        return woken
 
 # This is very similar to Search._expand_regions()
-# Try to access all exits we have not been able to access yet
-# Output a number of changes and a list of failed exits to potentially re-try again
+# Try to access all exits in the queue (exit numbers in the RegionGraph)
+# Output a number of changes; failed exits are parked in wakeups until something they depend on changes
 # Also add any reached_regions to the list and any exits that need exploring to the list
-def filterRegions(exit_queue, world, age, reached_regions, please_explore=True):
-    failed = []
+# If a trace is supplied, every successful step is recorded in it so that SolveState can replay it later
+def filterRegions(exit_queue, graph, age, reached_regions, wakeups, please_explore=True, trace=None):
     changes = 0
-
-    for exit in exit_queue:
-        if exit.shuffled:
-            if please_explore and exit.access_rule(world.state, spot=exit, age=age):
-                exit.please_explore = True
+    state = graph.world.state
+    exits = graph.exits
+    destinations = graph.destinations
+    explore_flags = getEntranceGraph(graph.world).please_explore
+
+    for exit_id in exit_queue:
+        destination = destinations[exit_id]
+        if destination < 0:
+            # Shuffled
+            if not please_explore:
+                continue
+            exit = exits[exit_id]
+            success, dependencies = checkRule(exit, state, age)
+            if success:
+                explore_flags[exit_id] = 1
                 changes += 1
+                if trace is not None:
+                    trace.append(('explore', age, exit_id))
             else:
-                failed.append(exit)
+                wakeups.park(('exit', age, exit_id), dependencies)
             continue
 
-        destination = world.get_region(exit.connected_region)
-        if destination in reached_regions:
+        if reached_regions.has(destination):
             continue
-        if exit.access_rule(world.state, spot=exit, age=age):
+        success, dependencies = checkRule(exits[exit_id], state, age)
+        if success:
             changes += 1
-            reached_regions[destination] = destination.provides_time
-            reached_regions[world.get_region('Root')] |= destination.provides_time
-            exit_queue.extend(destination.exits)
+            reached_regions.reach(destination)
+            exit_queue.extend(graph.region_exits[destination])
+            if trace is not None:
+                trace.append(('region', age, exit_id))
         else:
-            failed.append(exit)
-    return changes, failed
+            wakeups.park(('exit', age, exit_id), dependencies)
+    return changes
 
 item_events = {
     'Stop GC Rolling Goron as Adult from Goron City': 'Stop GC Rolling Goron as Adult',
@@ -255,116 +394,484 @@ def doWeWantThisLoc(loc, world):
             return False
     return True
 
+# Locations that have not been reached yet, bucketed by parent region (the RegionGraph's buckets are shared)
+# Each age only tests the locations in regions it has newly reached, plus the ones that have been woken up
+class LocationFrontier:
+    def __init__(self, graph, locations):
+        self.locked = set(locations)
+        self.by_region = graph.region_locations
+        # Per age: how many of its reached regions have been looked at, and the locations to try again
+        self.regions_seen = {'child': 0, 'adult': 0}
+        self.retries = {'child': [], 'adult': []}
+
+    def copy(self):
+        other = LocationFrontier.__new__(LocationFrontier)
+        other.locked = self.locked.copy()
+        other.by_region = self.by_region
+        other.regions_seen = self.regions_seen.copy()
+        other.retries = {age: retries.copy() for age, retries in self.retries.items()}
+        return other
+
+    def __len__(self):
+        return len(self.locked)
+
+    def has_candidates(self, age, reachable_regions):
+        return len(self.retries[age]) > 0 or self.regions_seen[age] < len(reachable_regions)
+
+    # Reached regions are only ever added to, so new regions are at the end of their order
+    def candidates(self, age, reachable_regions):
+        candidates = [x for x in self.retries[age] if x in self.locked]
+        self.retries[age] = []
+        for region_id in reachable_regions.since(self.regions_seen[age]):
+            candidates.extend(x for x in self.by_region[region_id] if x in self.locked)
+        self.regions_seen[age] = len(reachable_regions)
+        return candidates
+
+    def retry(self, age, loc):
+        self.retries[age].append(loc)
+
+    def take(self, loc):
+        self.locked.remove(loc)
+
 # Very similar to Search.iter_reachable_locations
-# Go through the list of locked_locations and move them to the possible_locations list if accessible
-def filterLocations(locked_locations, possible_locations, reachable_regions, state, age, world):
+# Go through the frontier of locked locations and move them to the possible_locations list if accessible
+# Failed locations are parked in wakeups until something they depend on changes
+def filterLocations(frontier, possible_locations, reachable_regions, state, age, world, wakeups, trace=None):
     changes = 0
 
-    # Filter the list without removing from locked_locations
+    # Filter the candidates without removing from the frontier
     reach_these = []
-    for loc in locked_locations:
-        if loc.parent_region not in reachable_regions:
-            continue
-        if not loc.access_rule(state, spot=loc, age=age):
+    for loc in frontier.candidates(age, reachable_regions):
+        success, dependencies = checkRule(loc, state, age)
+        if not success:
+            wakeups.park(('location', age, loc), dependencies)
             continue
         changes += 1
         if loc.name in item_events:
             state.prog_items[item_events[loc.name]] += 1
         reach_these.append(loc)
+        if trace is not None:
+            trace.append(('location', age, loc))
 
-    # Now move items from one list to the other
+    # Now move items from the frontier to the list
     for loc in reach_these:
-        locked_locations.remove(loc)
+        frontier.take(loc)
         if doWeWantThisLoc(loc, world):
             possible_locations.append(loc)
 
     return changes
 
+# Decide whether a possible location is collected automatically
+# Returns (collect, item name or None)
+def autocollectItem(loc):
+    if loc.name == 'Ganon':
+        # Don't hide the wincon!
+        return False, None
+    if loc.locked and loc.item.name not in drops_we_are_interested_in:
+        return True, loc.item.name
+    if loc.type == 'Event':
+        return True, loc.item.name
+    if loc.type in ('HintStone', 'Drop'):
+        return True, loc.item.name if loc.item else None
+    return False, None
+
 # If the item type is an event, fixed location, or drop, collect it automatically
-def autocollect(possible_locations, collected_locations, state):
+def autocollect(possible_locations, collected_locations, state, trace=None):
     collect_items = []
     move_locs = []
 
     for loc in possible_locations:
-        if loc.name == 'Ganon':
-            # Don't hide the wincon!
-            continue
-        if loc.locked and loc.item.name not in drops_we_are_interested_in:
-            collect_items.append(loc.item.name)
-            move_locs.append(loc)
-            continue
-        if loc.type == 'Event':
-            collect_items.append(loc.item.name)
-            move_locs.append(loc)
-            continue
-        if loc.type in ('HintStone', 'Drop'):
-            if loc.item:
-                collect_items.append(loc.item.name)
-            move_locs.append(loc)
+        collect, item = autocollectItem(loc)
+        if not collect:
             continue
+        if item:
+            collect_items.append(item)
+        move_locs.append(loc)
 
     for item in collect_items:
         state.prog_items[item] += 1
     for loc in move_locs:
         possible_locations.remove(loc)
         collected_locations.append(loc)
+        if trace is not None:
+            trace.append(('collect', None, loc))
 
     return len(move_locs)
 
-def solve(world, prog_items, starting_region='Root'):
-    root_region = world.get_region(starting_region)
-    reached_regions = {'child': {root_region:TimeOfDay.NONE},
-                       'adult': {root_region:TimeOfDay.NONE}}
-    all_locations = [x for region in world.regions for x in region.locations]
-    locked_locations=all_locations[:]
-    possible_locations=[]
-    collected_locations=[]
-    allkeys_possible_locations = []
-    queues = {'child': [exit for exit in root_region.exits],
-              'adult': [exit for exit in root_region.exits]}
-
-    # Provide an implementation of world.state.search.can_reach
-    world.state.search = SearchClass(world, reached_regions)
-
-    world.state.prog_items = prog_items.copy()
-    InventoryManager.add_free_items(world, world.state.prog_items)
+# Run the worklists to a fixed point
+# Instead of sweeping every failed rule on every pass, only the rules woken up by changed items, events
+# and region reaches are tried again
+def runWorklists(graph, queues, frontier, possible_locations, collected_locations, reached_regions, wakeups, please_explore=True, trace=None, stats=None):
+    world = graph.world
+    regions_woken = {age: len(reached_regions[age]) for age in reached_regions}
+    while True:
+        # Wake up everything that depends on what has changed
+        changed = world.state.prog_items.changed
+        world.state.prog_items.changed = set()
+        if changed:
+            changed.add(ANY_ITEM)
+        for age in reached_regions:
+            if regions_woken[age] != len(reached_regions[age]):
+                regions_woken[age] = len(reached_regions[age])
+                changed.add(('reach', age))
+        for kind, age, spot in wakeups.wake(changed):
+            if kind == 'exit':
+                queues[age].append(spot)
+            else:
+                frontier.retry(age, spot)
 
-    # Map traversal
-    changes = 1
-    while changes:
-        changes = 0
+        if not any(queues[age] or frontier.has_candidates(age, reached_regions[age]) for age in reached_regions):
+            break
 
+        if stats is not None:
+            stats.passes += 1
         for age in ['adult', 'child']:
-            add_changes, queues[age] = filterRegions(queues[age], world, age, reached_regions[age], please_explore=True)
-            changes += add_changes
-            changes += filterLocations(locked_locations, possible_locations, reached_regions[age], world.state, age, world)
-
-        changes += autocollect(possible_locations, collected_locations, world.state)
-
-    if world.settings.shuffle_smallkeys in ['vanilla', 'dungeon']:
-        # Give max small keys and try again, to see which locations are "ignore small key logic" possible
-        allkeys_possible_locations = possible_locations.copy()
-        allkeys_reached_regions = { 'child':reached_regions['child'].copy(),
-                                    'adult':reached_regions['adult'].copy()}
-        key_amounts = InventoryManager.get_small_key_limits(world)
-        # Free keys are given to fix the logic sometimes. So instead of comparing the current prog items,
-        # Compare the base prog items amount with expected
-        for key, amount in key_amounts.items():
-            difference = amount - prog_items[key]
-            if difference > 0:
-                world.state.prog_items[key] += difference
-        changes = 1
-        while changes:
-            changes = 0
-
-            for age in ['adult', 'child']:
-                add_changes, queues[age] = filterRegions(queues[age], world, age, allkeys_reached_regions[age], please_explore=False)
-                changes += add_changes
-                changes += filterLocations(locked_locations, allkeys_possible_locations, allkeys_reached_regions[age], world.state, age, world)
+            with timePhase(stats, 'filterRegions'):
+                filterRegions(queues[age], graph, age, reached_regions[age], wakeups, please_explore=please_explore, trace=trace)
+            queues[age] = []
+            with timePhase(stats, 'filterLocations'):
+                filterLocations(frontier, possible_locations, reached_regions[age], world.state, age, world, wakeups, trace=trace)
+
+        with timePhase(stats, 'autocollect'):
+            autocollect(possible_locations, collected_locations, world.state, trace=trace)
+
+# Time a phase of the solve if there is a SolverStats to time it for
+def timePhase(stats, name):
+    return stats.phase(name) if stats is not None else nullcontext()
+
+# The fixed point reached by solve(), kept so that the next solve can start from it instead of from Root
+#
+# The trace is every successful step in the order it happened. Adding items or connecting exits can only grow the
+# fixed point, so we carry on from the current frontier. Removing items or reshuffling exits can shrink it, so we
+# replay the trace with the new inputs, keep the steps that still hold, and carry on from that.
+# Changed rules (see rulesChanged) are replayed too.
+class SolveState:
+    def __init__(self, world, prog_items, starting_region='Root'):
+        self.world = world
+        self.graph = getRegionGraph(world)
+        self.graph.sync()
+        self.entrances = getEntranceGraph(world)
+        self.starting_region = starting_region
+        self.base_prog_items = prog_items.copy()
+        # Each exit's connection as of the last solve, and the RegionGraph's version then
+        self.connections = list(self.graph.connections)
+        self.changes_seen = self.graph.version
+        self.rule_version = getattr(world, 'rule_version', 0)
+        self.all_locations = [x for region in world.regions for x in region.locations]
+        self.stats = None
+        self.start_over()
+
+    def start_over(self):
+        world = self.world
+        graph = self.graph
+        root_id = graph.region_id(self.starting_region)
+        self.reached_regions = {'child': ReachedRegions(graph),
+                                'adult': ReachedRegions(graph)}
+        for reached_regions in self.reached_regions.values():
+            reached_regions.start(root_id)
+        self.queues = {'child': list(graph.region_exits[root_id]),
+                       'adult': list(graph.region_exits[root_id])}
+        self.locked_locations = LocationFrontier(graph, self.all_locations)
+        self.possible_locations = []
+        self.collected_locations = []
+        self.wakeups = Wakeups()
+        self.trace = []
+        self.explored = set()
+        self.entrances.clearExplore()
+
+        self.prog_items = TrackedCounter(self.base_prog_items)
+        import InventoryManager
+        InventoryManager.add_free_items(world, self.prog_items)
+
+    # Bring the fixed point up to date with new prog_items and whatever exits have changed since the last solve
+    def update(self, prog_items):
+        graph = self.graph
+        added = prog_items - self.base_prog_items
+        removed = self.base_prog_items - prog_items
+        self.base_prog_items = prog_items.copy()
+
+        connected = []
+        retract = len(removed) > 0
+        rule_version = getattr(self.world, 'rule_version', 0)
+        if rule_version != self.rule_version:
+            # Rules can have become stricter or looser, so every step has to be checked again
+            retract = True
+            self.rule_version = rule_version
+        if getRegionGraph(self.world) is not graph:
+            # The regions themselves have changed, so nothing carries over
+            self.graph = getRegionGraph(self.world)
+            self.entrances = getEntranceGraph(self.world)
+            self.connections = list(self.graph.connections)
+            self.changes_seen = self.graph.version
+            self.start_over()
+            return
+        # Only the exits that EntranceGraph has changed since the last solve need looking at
+        for exit_id in graph.changed_since(self.changes_seen):
+            old_shuffled, old_destination = self.connections[exit_id]
+            connection = graph.connections[exit_id]
+            if connection == (old_shuffled, old_destination):
+                continue
+            if not old_shuffled:
+                # Reshuffled, or now leads somewhere else
+                retract = True
+            if not connection[0]:
+                connected.append(exit_id)
+            self.connections[exit_id] = connection
+        self.changes_seen = graph.version
+
+        if retract:
+            self.replay()
+            return
+
+        # Only growth: add the new items (which wakes up whatever depends on them)
+        # and retry newly connected exits from any region that reaches them
+        for item, count in added.items():
+            self.prog_items[item] += count
+        for age in ['adult', 'child']:
+            if connected:
+                # A new exit can carry time of day between regions that were already reached
+                self.prog_items.changed.add(('reach', age))
+            queued = set(self.queues[age])
+            for exit_id in connected:
+                if self.reached_regions[age].has(graph.exit_sources[exit_id]) and exit_id not in queued:
+                    self.queues[age].append(exit_id)
+
+    # Replay the trace against the current inputs, keeping every step that is still justified by the steps before it
+    def replay(self):
+        world = self.world
+        graph = self.graph
+        old_trace = self.trace
+        self.start_over()
+        state = world.state
+        state.prog_items = self.prog_items
+        state.search = SearchClass(world, self.reached_regions)
+
+        taken = set()
+        possible = set()
+        explored = set()
+        for step in old_trace:
+            kind, age, spot = step
+            if kind == 'collect':
+                if spot not in possible:
+                    continue
+                collect, item = autocollectItem(spot)
+                if item:
+                    self.prog_items[item] += 1
+                possible.remove(spot)
+                self.possible_locations.remove(spot)
+                self.collected_locations.append(spot)
+                self.trace.append(step)
+                continue
 
-            changes += autocollect(allkeys_possible_locations, collected_locations, world.state)
+            reached_regions = self.reached_regions[age]
+            if kind == 'location':
+                if spot in taken or not reached_regions.has(graph.region_ids[spot.parent_region]):
+                    continue
+                if not spot.access_rule(state, spot=spot, age=age):
+                    continue
+                taken.add(spot)
+                if spot.name in item_events:
+                    self.prog_items[item_events[spot.name]] += 1
+                if doWeWantThisLoc(spot, world):
+                    possible.add(spot)
+                    self.possible_locations.append(spot)
+            else:
+                exit = graph.exits[spot]
+                if not reached_regions.has(graph.exit_sources[spot]):
+                    continue
+                destination = graph.destinations[spot]
+                if kind == 'explore':
+                    if destination >= 0 or not exit.access_rule(state, spot=exit, age=age):
+                        continue
+                    self.entrances.please_explore[spot] = 1
+                    self.explored.add(spot)
+                    explored.add((age, spot))
+                else:
+                    if destination < 0 or reached_regions.has(destination):
+                        continue
+                    if not exit.access_rule(state, spot=exit, age=age):
+                        continue
+                    reached_regions.reach(destination)
+            self.trace.append(step)
+
+        # Everything that didn't survive goes back on the worklists
+        self.locked_locations = LocationFrontier(graph, [x for x in self.all_locations if x not in taken])
+        for age, reached_regions in self.reached_regions.items():
+            queue = []
+            for region_id in reached_regions.order:
+                for exit_id in graph.region_exits[region_id]:
+                    destination = graph.destinations[exit_id]
+                    if destination < 0:
+                        if (age, exit_id) not in explored:
+                            queue.append(exit_id)
+                    elif not reached_regions.has(destination):
+                        queue.append(exit_id)
+            self.queues[age] = queue
 
-    return {'possible_locations':possible_locations, 'adult_reached':reached_regions['adult'], 'child_reached':reached_regions['child'], 'allkeys_possible_locations':allkeys_possible_locations}
+    # Map traversal
+    def run(self):
+        world = self.world
+        world.state.prog_items = self.prog_items
+        world.state.search = SearchClass(world, self.reached_regions, stats=self.stats)
+        # The please_explore flags belong to this fixed point (a cached result may have set them differently)
+        entrances = self.entrances
+        self.explored = set(exit_id for exit_id in self.explored if entrances.shuffled[exit_id])
+        entrances.clearExplore()
+        for exit_id in self.explored:
+            entrances.please_explore[exit_id] = 1
+        traced = len(self.trace)
+        runWorklists(self.graph, self.queues, self.locked_locations, self.possible_locations, self.collected_locations,
+                     self.reached_regions, self.wakeups, please_explore=True, trace=self.trace, stats=self.stats)
+        self.explored.update(spot for kind, _, spot in self.trace[traced:] if kind == 'explore')
+
+    # Find the fewest of each dungeon's small keys that every location needs, with the other keys left as they are
+    # Each key type gets one sweep that raises it a key at a time and carries on from the last fixed point at each step,
+    # instead of a solve per key count. Every sweep starts from copies of this fixed point, which is left alone for the next solve
+    # Only the key types that some parked rule has read can open anything, so the others get no sweep
+    # A location that more than one key type opens reports its own dungeon's key, or else the first one found
+    # A last step with every key at its maximum finds the "ignore small key logic" locations; the ones that only open
+    # with several dungeons' keys get no key count
+    # Returns the "ignore small key logic" possible locations, and {location: (key item, count)}
+    def small_keys_needed(self):
+        import InventoryManager
+        key_amounts = InventoryManager.get_small_key_limits(self.world)
+        # Free keys are given to fix the logic sometimes. So instead of comparing the current prog items,
+        # Compare the base prog items amount with expected
+        missing_keys = {key: amount - self.base_prog_items[key] for key, amount in key_amounts.items()
+                        if amount > self.base_prog_items[key]}
+
+        waiting = self.wakeups.waiting
+        missing_keys = {key: missing for key, missing in missing_keys.items() if key in waiting or ANY_ITEM in waiting}
+
+        keys_needed = {}
+        for key, missing in sorted(missing_keys.items()):
+            sweep = self.keySweep()
+            seen = set(sweep.possible_locations)
+            for step in range(1, missing + 1):
+                sweep.raiseKeys({key: 1})
+                for loc in sweep.possible_locations:
+                    if loc in seen:
+                        continue
+                    seen.add(loc)
+                    if loc not in keys_needed or key == ownSmallKey(loc):
+                        keys_needed[loc] = (key, self.base_prog_items[key] + step)
+
+        if not missing_keys:
+            return self.possible_locations.copy(), keys_needed
+        sweep = self.keySweep()
+        sweep.raiseKeys(missing_keys)
+        return sweep.possible_locations, keys_needed
+
+    def keySweep(self):
+        return KeySweep(self)
+
+# The small key of the dungeon a location is in, or None outside the dungeons
+def ownSmallKey(loc):
+    dungeon = getattr(loc.parent_region, 'dungeon', None)
+    if dungeon is None:
+        return None
+    return "Small Key ({})".format(dungeon.name)
+
+# Copies of a SolveState's fixed point that small keys are added to, for SolveState.small_keys_needed()
+class KeySweep:
+    def __init__(self, solve_state):
+        self.solve_state = solve_state
+        self.world = solve_state.world
+        self.possible_locations = solve_state.possible_locations.copy()
+        self.reached_regions = {age: reached.copy() for age, reached in solve_state.reached_regions.items()}
+        self.queues = {age: queue.copy() for age, queue in solve_state.queues.items()}
+        self.frontier = solve_state.locked_locations.copy()
+        self.wakeups = solve_state.wakeups.copy()
+        self.prog_items = solve_state.prog_items.copy()
+
+    def raiseKeys(self, amounts):
+        world = self.world
+        for key, amount in amounts.items():
+            self.prog_items[key] += amount
+        world.state.prog_items = self.prog_items
+        world.state.search = SearchClass(world, self.reached_regions, stats=self.solve_state.stats)
+        runWorklists(self.solve_state.graph, self.queues, self.frontier, self.possible_locations, [],
+                     self.reached_regions, self.wakeups, please_explore=False, stats=self.solve_state.stats)
+
+# Rebuild a solve() output for this world from a SolveCache entry
+def resultFromCacheEntry(world, entry):
+    graph = getRegionGraph(world)
+    reached_regions = {}
+    for age in ['child', 'adult']:
+        reached_regions[age] = ReachedRegions(graph)
+        for name, tod in entry[age + '_reached']:
+            region_id = graph.region_id(name)
+            reached_regions[age].start(region_id)
+            reached_regions[age].add_tod(region_id, tod)
+    getEntranceGraph(world).setExploreNames(entry['please_explore'])
+    world.state.prog_items = Counter(entry['prog_items'])
+    world.state.search = SearchClass(world, reached_regions)
+    return {'possible_locations':[world.get_location(name) for name in entry['possible_locations']],
+            'adult_reached':reached_regions['adult'],
+            'child_reached':reached_regions['child'],
+            'allkeys_possible_locations':[world.get_location(name) for name in entry['allkeys_possible_locations']],
+            'small_keys_needed':{world.get_location(name): (key, count) for name, key, count in entry['small_keys_needed']}}
+
+# Solve the logic for this inventory
+# If the output of a previous solve of the same world is supplied as previous, its fixed point is reused:
+# the item and exit differences since then are worked out and only what they can affect is re-explored
+# If a SolveCache is supplied, any state that has been solved before is returned straight from it
+# If solver stats are turned on (see SolverStats), the output also has a 'stats' SolverStats, which is logged too
+def solve(world, prog_items, starting_region='Root', previous=None, cache=None):
+    stats = SolverStats.SolverStats() if SolverStats.enabled else None
+    solve_state = previous.get('solve_state') if previous else None
+    if solve_state is not None and (solve_state.world is not world or solve_state.starting_region != starting_region
+                                    or solve_state.graph is not getRegionGraph(world)):
+        # Another world, or this world's regions have been replaced (see Reconfigure.swapDungeons)
+        solve_state = None
+
+    if cache is not None:
+        key = SolveCache.solveKey(world, prog_items, starting_region)
+        entry = cache.get(key)
+        if entry is not None:
+            # The fixed point is left where it was; the next solve works out its differences from there
+            result = resultFromCacheEntry(world, entry)
+            result['solve_state'] = solve_state
+            if stats is not None:
+                stats.cache_hit = True
+                stats.log()
+                result['stats'] = stats
+            return result
+
+    if stats is not None:
+        stats.watchRules(world)
+    try:
+        with timePhase(stats, 'update'):
+            if solve_state is None:
+                solve_state = SolveState(world, prog_items, starting_region=starting_region)
+            else:
+                solve_state.update(prog_items)
+        solve_state.stats = stats
+        solve_state.run()
+
+        allkeys_possible_locations = []
+        small_keys_needed = {}
+        if world.settings.shuffle_smallkeys in ['vanilla', 'dungeon']:
+            with timePhase(stats, 'allkeys'):
+                allkeys_possible_locations, small_keys_needed = solve_state.small_keys_needed()
+    finally:
+        if stats is not None:
+            stats.unwatchRules()
+        if solve_state is not None:
+            solve_state.stats = None
+
+    result = {'possible_locations':solve_state.possible_locations.copy(),
+              'adult_reached':solve_state.reached_regions['adult'].copy(),
+              'child_reached':solve_state.reached_regions['child'].copy(),
+              'allkeys_possible_locations':allkeys_possible_locations,
+              'small_keys_needed':small_keys_needed}
+    if cache is not None:
+        cache.put(key, SolveCache.resultToEntry(world, result))
+    result['solve_state'] = solve_state
+    if stats is not None:
+        stats.log()
+        result['stats'] = stats
+    return result
 
 def get_shuffled_exits(settings):
     settings_to_types_dict = {
@@ -399,66 +906,73 @@ def get_shuffled_exits(settings):
         shuffled_types.append('DungeonSpecial')
 
     shuffle_these = set()
-    for x in EntranceShuffle.entrance_shuffle_table:
-        if x[0] not in shuffled_types:
-            continue
-        assert len(x) >= 2
-        assert len(x) <= 3
-        if len(x) == 2 and x[0] == 'Overworld' and not getattr(settings, 'decouple_entrances', False):
-            # The GV Lower Stream -> Lake Hylia exit isn't shuffled unless the exits are decoupled
-            continue
-        shuffle_these.add(x[1][0])
-        if len(x) > 2:
-            shuffle_these.add(x[2][0])
+    index = EntranceIndex.getIndex()
+    for type in set(shuffled_types):
+        for forward, back in index.entriesOfTypes([type]):
+            if back is None and type == 'Overworld' and not getattr(settings, 'decouple_entrances', False):
+                # The GV Lower Stream -> Lake Hylia exit isn't shuffled unless the exits are decoupled
+                continue
+            shuffle_these.add(forward)
+            if back is not None:
+                shuffle_these.add(back)
 
     return shuffle_these
 
 # Mark all exits shuffled that would be shuffled according to the settings
 def shuffleExits(world):
     shuffle_these = get_shuffled_exits(world.settings)
-    all_exits = [x for region in world.regions for x in region.exits]
-    for x in all_exits:
+    entrances = getEntranceGraph(world)
+    for exit_id, x in enumerate(entrances.exits):
+        # After a settings change the world has been explored already, so its exits go back to vanilla first
+        # (ExploreLogic fills the known ones in again from the save file)
+        if x.shuffled or entrances.known[exit_id]:
+            entrances.restore(exit_id)
         if x.name in shuffle_these:
-            x.shuffled = True
+            entrances.shuffle(exit_id)
         if 'Boss Room' in x.connected_region and not x.shuffled:
             # Unshuffled boss rooms need their hint areas marked
             other_region = world.get_region(x.connected_region)
             other_region.dungeon = x.parent_region.dungeon
 
 #What to display to the user as un-collected items
-total_equipment = ItemPool.item_groups['ProgressItem'] + ItemPool.item_groups['Song'] + ItemPool.item_groups['DungeonReward'] + [
-'Small Key (Bottom of the Well)',
-'Small Key (Forest Temple)',
-'Small Key (Fire Temple)',
-'Small Key (Water Temple)',
-'Small Key (Shadow Temple)',
-'Small Key (Spirit Temple)',
-'Small Key (Gerudo Fortress)',
-'Small Key (Gerudo Training Ground)',
-'Small Key (Ganons Castle)',
-'Boss Key (Forest Temple)',
-'Boss Key (Fire Temple)',
-'Boss Key (Water Temple)',
-'Boss Key (Shadow Temple)',
-'Boss Key (Spirit Temple)',
-'Boss Key (Ganons Castle)',
-'Bombchu Drop',
-'Zeldas Letter',
-'Weird Egg',
-'Rutos Letter',
-'Gerudo Membership Card',
-'Deku Stick Capacity',
-'Deku Shield',
-'Gold Skulltula Token',
-'Hylian Shield',
-] + list(ItemPool.trade_items)
+def totalEquipment():
+    import ItemPool
+    return ItemPool.item_groups['ProgressItem'] + ItemPool.item_groups['Song'] + ItemPool.item_groups['DungeonReward'] + [
+    'Small Key (Bottom of the Well)',
+    'Small Key (Forest Temple)',
+    'Small Key (Fire Temple)',
+    'Small Key (Water Temple)',
+    'Small Key (Shadow Temple)',
+    'Small Key (Spirit Temple)',
+    'Small Key (Gerudo Fortress)',
+    'Small Key (Gerudo Training Ground)',
+    'Small Key (Ganons Castle)',
+    'Boss Key (Forest Temple)',
+    'Boss Key (Fire Temple)',
+    'Boss Key (Water Temple)',
+    'Boss Key (Shadow Temple)',
+    'Boss Key (Spirit Temple)',
+    'Boss Key (Ganons Castle)',
+    'Bombchu Drop',
+    'Zeldas Letter',
+    'Weird Egg',
+    'Rutos Letter',
+    'Gerudo Membership Card',
+    'Deku Stick Capacity',
+    'Deku Shield',
+    'Gold Skulltula Token',
+    'Hylian Shield',
+    ] + list(ItemPool.trade_items)
 
 def getInputData(filename):
     try:
         input_data = TextSettings.readFromFile(filename)
     except FileNotFoundError:
         input_data = {}
+    return completeInputData(input_data)
 
+# Fill in the parts of a save that are allowed to be missing
+def completeInputData(input_data):
     # Make some input data empty lists if they are not present
     for key in ['equipment', 'checked_off', 'one_wallet', 'two_wallets', 'known_exits', 'paired_exits']:
         if key not in input_data:
@@ -476,85 +990,184 @@ def getInputData(filename):
             input_data['known_exits'].append(x)
     return input_data
 
+# Time of day reachability for one age and one time of day, kept between queries during a solve
+# Exits are only tried again when something could have changed their answer: failed rules once items change,
+# and exits into unreached regions once the age reaches more regions
+class TimeOfDayClosure:
+    def __init__(self):
+        self.pending = deque()
+        self.failed = []
+        self.failed_reads = set()
+        self.unreached = []
+        self.regions_seen = 0
+        self.root_flagged = False
+        self.version = None
+
 class SearchClass():
-    def __init__(self, world, reached_regions):
+    def __init__(self, world, reached_regions, stats=None):
         self.world = world
+        self.graph = getRegionGraph(world)
         self.reached_regions = reached_regions
+        self.closures = {}
+        if stats is not None:
+            stats.watchMethod(self, 'propagate_tod')
 
     def can_reach(self, region, age, tod):
         assert tod in [TimeOfDay.DAY, TimeOfDay.DAMPE]
-
-        if self.reached_regions[age][region] & tod:
+        # The answer can change whenever this age reaches another region
+        noteDependency(self.world.state, ('reach', age))
+
+        regions = self.reached_regions[age]
+        region_id = self.graph.region_id(region)
+        if not regions.has(region_id):
+            raise KeyError(region)
+        if regions.tod(region_id) & tod:
             return True
 
-        return self.propagate_tod(self.reached_regions[age], age, tod, goal_region=region)
-
-    def propagate_tod(self, regions, age, tod, goal_region):
-        exit_queue = []
-        for region in regions:
-            if not regions[region] & tod:
-                continue
-            exit_queue.extend(region.exits)
-
-        while len(exit_queue):
-            exit = exit_queue.pop(0)
+        if (age, tod) not in self.closures:
+            self.closures[(age, tod)] = TimeOfDayClosure()
+        closure = self.closures[(age, tod)]
+        if self.propagate_tod(closure, regions, age, tod, goal_region=region_id):
+            return True
+        # A "no" also depends on everything that the failed exits looked at
+        for dependency in closure.failed_reads:
+            noteDependency(self.world.state, dependency)
+        return False
 
-            if exit.shuffled:
+    # Catch the closure up with items collected and regions reached since it was last used
+    def sync_closure(self, closure, regions, tod):
+        graph = self.graph
+        version = getattr(self.world.state.prog_items, 'version', None)
+        if version is None or version != closure.version:
+            closure.pending.extend(closure.failed)
+            closure.failed = []
+            closure.failed_reads = set()
+            closure.version = version
+
+        if closure.regions_seen != len(regions):
+            closure.pending.extend(closure.unreached)
+            closure.unreached = []
+            for region_id in regions.since(closure.regions_seen):
+                if regions.tod(region_id) & tod:
+                    closure.pending.extend(graph.region_exits[region_id])
+                    if region_id == graph.root:
+                        closure.root_flagged = True
+            closure.regions_seen = len(regions)
+
+        # Root is the one region that gains time of day after it has been reached
+        if not closure.root_flagged and regions.tod(graph.root) & tod:
+            closure.root_flagged = True
+            closure.pending.extend(graph.region_exits[graph.root])
+
+    def propagate_tod(self, closure, regions, age, tod, goal_region):
+        self.sync_closure(closure, regions, tod)
+        graph = self.graph
+        prog_items = self.world.state.prog_items
+        tracked = hasattr(prog_items, 'reads')
+
+        while len(closure.pending):
+            exit_id = closure.pending.popleft()
+
+            destination = graph.destinations[exit_id]
+            if destination < 0:
+                # Shuffled
                 continue
-            destination = self.world.get_region(exit.connected_region)
-            if destination not in regions:
+            if not regions.has(destination):
+                closure.unreached.append(exit_id)
                 continue
-            if regions[destination] & tod:
+            if regions.tod(destination) & tod:
                 continue
-            if exit.access_rule(self.world.state, spot=exit, age=age, tod=tod):
-                regions[destination] |= tod
+            exit = graph.exits[exit_id]
+            if tracked:
+                outer_reads = prog_items.reads
+                prog_items.reads = set()
+            try:
+                success = exit.access_rule(self.world.state, spot=exit, age=age, tod=tod)
+            finally:
+                if tracked:
+                    reads = prog_items.reads
+                    prog_items.reads = outer_reads
+            if success:
+                regions.add_tod(destination, tod)
+                closure.pending.extend(graph.region_exits[destination])
                 if destination == goal_region:
                     return True
-                exit_queue.extend(destination.exits)
+            else:
+                closure.failed.append(exit_id)
+                if tracked:
+                    closure.failed_reads |= reads
         return False
 
-def startWorldBasedOnData(input_data, gui_dialog):
-    world = generate(input_data, gui_dialog=gui_dialog)
-
-    LocationLogic.populateKnownUnshuffled(world)
-
-    # Fix the bug in World.py code
-    max_tokens = 0
-    if world.settings.bridge == 'tokens':
-        max_tokens = max(max_tokens, world.settings.bridge_tokens)
-    if world.settings.lacs_condition == 'tokens':
-        max_tokens = max(max_tokens, world.settings.lacs_tokens)
-    tokens = [50, 40, 30, 20, 10]
-    for t in tokens:
-        if f'Kak {t} Gold Skulltula Reward' not in world.settings.disabled_locations:
-            max_tokens = max(max_tokens, t)
-    world.max_progressions['Gold Skulltula Token'] = max_tokens
+def startWorldBasedOnData(input_data, gui_dialog, world_id=0):
+    world = generate(input_data, gui_dialog=gui_dialog, world_id=world_id)
+    return finishWorld(world, input_data)
 
-    # Populate starting equipment into state.prog_items
-    for x in input_data['equipment']:
-        world.state.prog_items[x] += 1
+# The prog_items for a save file's equipment list
+def equipmentProgItems(equipment):
+    prog_items = Counter()
+    for x in equipment:
+        prog_items[x] += 1
         if x == 'Deku Shield':
-            world.state.prog_items['Buy Deku Shield'] += 1
+            prog_items['Buy Deku Shield'] += 1
         elif x == 'Deku Stick Capacity':
-            world.state.prog_items['Deku Stick Drop'] += 1
+            prog_items['Deku Stick Drop'] += 1
         elif x == 'Hylian Shield':
-            world.state.prog_items['Buy Hylian Shield'] += 1
+            prog_items['Buy Hylian Shield'] += 1
+    return prog_items
+
+# The parts of starting a world that come from the save file rather than the settings
+def finishWorld(world, input_data):
+    # Populate starting equipment into state.prog_items
+    world.state.prog_items.update(equipmentProgItems(input_data['equipment']))
 
     # Shuffle any shuffled exits, and fill in any explored exits
     shuffleExits(world)
 
+    # Merge each spot's rules into one function, and keep the compiled rules for next time
+    spots = [x for region in world.regions for x in region.exits + region.locations]
+    flattened = world.rule_compiler.flatten(spots)
+    logging.info("Rule compiler: {} ({} spots flattened)".format(world.rule_compiler.stats(), flattened))
+    world.rule_compiler.save()
+
     # Set price rules that we have enabled
+    world.wallet_requirements = {}
+    world.wallet_rules = {}
     for name in input_data['one_wallet']:
-        loc = world.get_location(name)
-        wallet1 = world.parser.parse_rule('(Progressive_Wallet, 1)')
-        loc.add_rule(wallet1)
+        setWalletRequirement(world, world.get_location(name), 1)
     for name in input_data['two_wallets']:
-        loc = world.get_location(name)
-        wallet2 = world.parser.parse_rule('(Progressive_Wallet, 2)')
-        loc.add_rule(wallet2)
+        setWalletRequirement(world, world.get_location(name), 2)
 
     return world
 
+# A location's wallet requirement sits on top of its own rule, so that it can be set, changed or cleared (0) in place
+def setWalletRequirement(world, loc, wallets):
+    base_rule = getattr(loc, 'base_access_rule', None)
+    if base_rule is None:
+        base_rule = loc.base_access_rule = loc.access_rule
+    if wallets:
+        world.wallet_requirements[loc.name] = wallets
+        loc.access_rule = walletOverlay(walletRule(world, wallets), base_rule)
+    else:
+        world.wallet_requirements.pop(loc.name, None)
+        loc.access_rule = base_rule
+    rulesChanged(world)
+
+# The parsed rule for a number of wallets, shared by every location that needs that many
+def walletRule(world, wallets):
+    rule = world.wallet_rules.get(wallets)
+    if rule is None:
+        rule = world.wallet_rules[wallets] = world.parser.parse_rule('(Progressive_Wallet, {})'.format(wallets))
+    return rule
+
+def walletOverlay(wallet_rule, base_rule):
+    def rule(state, **kwargs):
+        return wallet_rule(state, **kwargs) and base_rule(state, **kwargs)
+    return rule
+
+# Call this after changing any spot's access_rule, so that the next solve checks its earlier steps again
+def rulesChanged(world):
+    world.rule_version = getattr(world, 'rule_version', 0) + 1
+
 def possibleLocToString(loc, world, child_reached, adult_reached):
     # TODO: see if using the subrules can be refined here?
     child = loc.parent_region in child_reached and loc.access_rule(world.state, spot=loc, age='child')
@@ -573,10 +1186,12 @@ def writeResultsToFile(world, input_data, output_data, output_known_exits, filen
     # Propagate input data to output
     for key in ['equipment', 'checked_off', 'one_wallet', 'two_wallets', 'dungeon_mqs']:
         output_data[key] = input_data[key]
+    if input_data.get('sent_items'):
+        output_data['sent_items'] = input_data['sent_items']
     output_data['settings_string'] = [world.settings.settings_string]
 
     # Build possible equipment list as a suggestion for items which have not been collected yet
-    possible_equipment = total_equipment[:]
+    possible_equipment = totalEquipment()
     for x in output_data['equipment']:
         try:
             possible_equipment.remove(x)
@@ -604,6 +1219,9 @@ def writeResultsToFile(world, input_data, output_data, output_known_exits, filen
     # Output data that we don't want
     del output_data['child_reached']
     del output_data['adult_reached']
+    output_data.pop('solve_state', None)
+    output_data.pop('small_keys_needed', None)
+    output_data.pop('stats', None)
 
     if priorities is None:
         priorities = ["settings_string", "possible_locations", "known_exits", "other_shuffled_exits"]
@@ -629,11 +1247,24 @@ def exit_information_to_text(all_exits, known_exits, known_exit_pairs):
     return {'known_exits':known_exits, 'paired_exits':paired_exits}
 
 
-def textmode(filename):
+# With a spoiler log or plando, what can be taken from it is brought in first (see SpoilerImport)
+def textmode(filename, spoiler=None):
+    import ExploreLogic
+    import Transaction
     input_data = getInputData(filename)
-    world, output_known_exits = startWorldBasedOnData(input_data)
-    output_data = solve(world)
-    writeResultsToFile(world, input_data, output_data, output_known_exits, filename)
+    if getSettings(input_data).world_count > 1:
+        import Multiworld
+        Multiworld.textmode(filename, input_data, spoiler=spoiler)
+        return
+    world = startWorldBasedOnData(input_data, gui_dialog=False)
+    tracker = Transaction.TextTracker(world, input_data, ExploreLogic.ExploreLogic(world, input_data))
+    if spoiler:
+        import SpoilerImport
+        SpoilerImport.importFile(tracker, spoiler)
+    else:
+        tracker.solve(world.state.prog_items)
+    output_known_exits, output_known_exit_pairs = tracker.explore_logic.get_output()
+    writeResultsToFile(tracker.world, input_data, tracker.output_data, output_known_exits, filename, output_known_exit_pairs)
 
 if __name__ == "__main__":
     # Log to stderr and file
@@ -648,11 +1279,29 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--textmode', action="store_true")
     parser.add_argument('--filename', type=str, default="output.txt")
+    parser.add_argument('--import_spoiler', type=str, default=None, help='With --textmode, bring the dungeons, trials, entrances, shop prices and starting items of this spoiler log or plando file into the save file first.')
     parser.add_argument('--settings_string', help='Provide sharable settings using a settings string. This will override all flags that it specifies.')
+    parser.add_argument('--solve_cache', type=str, default=None, help='Keep solve results in this file so that later sessions can reuse them.')
+    parser.add_argument('--rule_cache', type=str, default=RuleCompiler.cache_dir, help='Keep compiled logic rules in this folder between sessions.')
+    parser.add_argument('--world_cache', type=str, default=WorldSnapshot.snapshot_dir, help='Keep built worlds in this folder between sessions.')
+    parser.add_argument('--import_profile', action="store_true", help='Report how long each module takes to import (for --textmode, or for the GUI), then exit.')
+    parser.add_argument('--solver_stats', nargs='?', const=True, default=None, help='Log where each solve spends its time (and append it as json lines to a file, if one is given). HOODTRACKER_SOLVER_STATS does the same.')
     args = parser.parse_args()
+    RuleCompiler.cache_dir = args.rule_cache or None
+    WorldSnapshot.snapshot_dir = args.world_cache or None
+    if args.solver_stats is not None:
+        SolverStats.enabled = True
+        if args.solver_stats is not True:
+            SolverStats.output_filename = args.solver_stats
+
+    if args.import_profile:
+        import ImportProfile
+        ImportProfile.report(['HoodTracker', 'ExploreLogic'] if args.textmode else ['HoodTracker', 'gui'])
+        sys.exit(0)
 
     # Launch gui or text mode
     if args.textmode:
-        textmode(args.filename)
+        textmode(args.filename, spoiler=args.import_spoiler)
     else:
-        gui.main(args.filename)
+        import gui
+        gui.main(args.filename, solve_cache_filename=args.solve_cache)
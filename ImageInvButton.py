@@ -123,6 +123,10 @@ class ImageInvButton(QAbstractButton):
         self.name = name
         self.current = current
         self.max = max
+        # Amount sent by other worlds of a multiworld seed, shown but not clickable
+        self.received = 0
+        # The trade widgets show how far along the trade sequence we are, rather than a count
+        self.levels = name in ['Adult Trade', 'Child Trade']
 
         # Load one or more images for this button
         image_names = imageNamesDict.get(name, "fix.png")
@@ -142,16 +146,23 @@ class ImageInvButton(QAbstractButton):
         if event.button() == Qt.RightButton:
             self.minusEvent()
 
+    # What the button shows: the clicked amount plus the received amount
+    def shown(self):
+        if self.levels:
+            return max(self.current, self.received)
+        return self.current + self.received
+
     def plusEvent(self):
-        if (self.current >= self.max):
+        if (self.shown() >= self.max):
             return
-        self.current = self.current + 1
+        self.current = self.shown() + 1 if self.levels else self.current + 1
         logging.info("User has increased {} to {}".format(self.name, self.current))
         self.update()
         self.parent.update(self)
 
     def minusEvent(self):
-        if (self.current < 1):
+        # The received amount can't be clicked away
+        if (self.shown() <= self.received):
             return
         self.current = self.current - 1
         logging.info("User has decreased {} to {}".format(self.name, self.current))
@@ -172,21 +183,22 @@ class ImageInvButton(QAbstractButton):
         painter = QtGui.QPainter(self)
         painter.fillRect(rect, QtGui.QColor(0,0,0))
 
-        if len(self.pixmaps) > 1 and self.current > 1:
-            pixmap = self.pixmaps[self.current - 1]
+        shown = self.shown()
+        if len(self.pixmaps) > 1 and shown > 1:
+            pixmap = self.pixmaps[shown - 1]
         else:
             pixmap = self.pixmaps[0]
         painter.drawPixmap(rect, pixmap)
-        if self.current == 0:
+        if shown == 0:
             painter.fillRect(rect, QtGui.QColor(0,0,0,180))
 
         # White text in center
-        if self.current > 0 and self.max > 1 and len(self.pixmaps) == 1:
+        if shown > 0 and self.max > 1 and len(self.pixmaps) == 1:
             font = QtGui.QFont('Open Sans', 14)
             painter.setPen(QtGui.QColor(0, 0, 0))
             painter.setBrush(QtGui.QBrush(QtGui.QColor(255, 255, 255)))
             path = QtGui.QPainterPath()
-            path.addText(0, 0, font, str(self.current))
+            path.addText(0, 0, font, str(shown))
             textcenter = path.boundingRect().center()
             boxcenter = QPointF(rect.center())
             difference = boxcenter - textcenter
@@ -207,6 +219,18 @@ class ImageInvButton(QAbstractButton):
             return
         logging.info("Updating limit of {} to {}".format(self.name, limit))
         self.max = limit
-        if self.current > self.max:
-            self.current = self.max
+        self.clampCurrent()
         self.update()
+
+    def setReceived(self, received):
+        if self.received == received:
+            return
+        logging.info("{} has {} received from other worlds".format(self.name, received))
+        self.received = received
+        self.clampCurrent()
+        self.update()
+
+    # Keep the clicked amount within what the received amount leaves room for
+    def clampCurrent(self):
+        room = self.max if self.levels else self.max - self.received
+        self.current = max(0, min(self.current, room))
@@ -0,0 +1,39 @@
+import logging
+import os
+import re
+import subprocess
+import sys
+
+# How many modules the report lists
+top_module_count = 25
+
+importtime_line = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Import these modules in a fresh python with -X importtime
+# Returns (module, depth, self seconds, cumulative seconds) for every module that got imported, in the order python reports them
+def profileImports(modules):
+    tracker_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(x for x in [tracker_dir, env.get('PYTHONPATH')] if x)
+    code = '; '.join('import {}'.format(name) for name in modules)
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, env=env)
+    if process.returncode != 0:
+        raise Exception("Importing {} failed:\n{}".format(', '.join(modules), process.stderr))
+
+    results = []
+    for line in process.stderr.splitlines():
+        match = importtime_line.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            results.append((name, (len(indent) - 1) // 2, int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return results
+
+# Log how long importing these modules takes, and which modules cost the most
+def report(modules):
+    results = profileImports(modules)
+    total = sum(cumulative for _, depth, _, cumulative in results if depth == 0)
+    logging.info("Importing {} took {:.1f}ms ({} modules)".format(', '.join(modules), total * 1000, len(results)))
+    logging.info("    {:>10} {:>10}  module".format('self ms', 'total ms'))
+    for name, _, self_seconds, cumulative in sorted(results, key=lambda x: x[3], reverse=True)[:top_module_count]:
+        logging.info("    {:10.1f} {:10.1f}  {}".format(self_seconds * 1000, cumulative * 1000, name))
+    return results
@@ -1,8 +1,6 @@
 from collections import Counter
 import ItemPool
-import GuiUtils
 from CommonUtils import *
-from ImageInvButton import ImageInvButton
 from itertools import chain
 import ItemList
 import LocationList
@@ -178,6 +176,9 @@ def orderGuiWidgets(inputwidgets):
 
 class InventoryManager:
     def __init__(self, inventory, parent):
+        # Only the widgets need Qt, so the solver can use this module headless
+        import GuiUtils
+        from ImageInvButton import ImageInvButton
         self.inv_widgets = [ImageInvButton(name=x.name, max=x.max, current=x.current, parent=self) for x in inventory]
         self.shown_widgets = orderGuiWidgets(self.inv_widgets)
         self.widget = GuiUtils.GridScrollSettingsArea(widgets=self.shown_widgets)
@@ -207,6 +208,28 @@ class InventoryManager:
         assert item.current <= item.max and item.current >= 0
         item.update()
 
+    # Replace the whole inventory with this equipment list, e.g. when the GUI switches to another world
+    def setEquipment(self, equipment):
+        for item in self.inv_widgets:
+            item.current = 0
+            item.update()
+        for name, count in Counter(equipment).items():
+            self.collectItem(name, count=count)
+
+    # Show what other worlds of a multiworld seed have sent, on top of the clicked amounts
+    # These aren't in getProgItems or getOutputFormat, since the sending world's save file is what counts them
+    def setReceived(self, received):
+        amounts = Counter()
+        for name, count in received.items():
+            if name in adult_trade:
+                amounts['Adult Trade'] = max(amounts['Adult Trade'], adult_trade.index(name) + 1)
+            elif name in child_trade:
+                amounts['Child Trade'] = max(amounts['Child Trade'], child_trade.index(name) + 1)
+            elif name in self.widgets_dict:
+                amounts[name] += count
+        for item in self.inv_widgets:
+            item.setReceived(min(amounts[item.name], item.max))
+
     # Other aliases for buyable / replaceable items
     item_aliases = {
         'Deku Shield': 'Buy Deku Shield',
@@ -52,7 +52,11 @@ def populateVanillaShop(world):
 
         loc.item = Item.Item(name=itemname)
         progression_locs.append(loc)
+    parsed_rules = {loc: list(getattr(loc, 'access_rules', [])) for loc in progression_locs}
     Rules.set_shop_rules(world)
+    # Keep what set_shop_rules() added on top of the parsed rule, so that Reconfigure can add it again after parsing the rule again
+    for loc, rules in parsed_rules.items():
+        loc.added_rules = [rule for rule in getattr(loc, 'access_rules', []) if rule not in rules]
 
     for loc in progression_locs:
         shopname = baseShopName(loc.item.name)
@@ -1,7 +1,9 @@
 
 from PySide2.QtWidgets import *
 from PySide2.QtGui import *
-import EntranceShuffle
+import EntranceIndex
+import ItemList
+from EntranceGraph import getEntranceGraph
 import re
 from CommonUtils import *
 import logging
@@ -57,14 +59,17 @@ class LocationManager:
 
         destination.addLoc(location)
 
-    def updateLocationPossible(self, possible_locations, allkeys_possible_locations):
+    def updateLocationPossible(self, possible_locations, allkeys_possible_locations, small_keys_needed=None):
+        if small_keys_needed is None:
+            small_keys_needed = {}
         possible_names = set(x.name for x in possible_locations)
         allkeys_names = set(x.name for x in allkeys_possible_locations)
+        keys_needed = {x.name: needed for x, needed in small_keys_needed.items()}
         for x in self.allLocations:
             possible = x.loc_name in possible_names
             if not possible and x.loc_name in allkeys_names:
                 possible = 2
-            x.setPossible(possible)
+            x.setPossible(possible, keys_needed=keys_needed.get(x.loc_name))
 
     def updateLocationsIgnored(self, world):
         for x in self.allLocations:
@@ -259,7 +264,7 @@ class NeighborhoodCategory(QStandardItem):
 
 
 class LocationEntry(QStandardItem):
-    def __init__(self, loc_name, type, possible, parent_region, checked=False, ignored=False, parent=None):
+    def __init__(self, loc_name, type, possible, parent_region, checked=False, ignored=False, parent=None, keys_needed=None):
         super().__init__()
 
         self.setEditable(False)
@@ -277,6 +282,7 @@ class LocationEntry(QStandardItem):
         else:
             self.setCheckState(Qt.CheckState.Unchecked)
         self.possible = possible
+        self.keys_needed = keys_needed
         self.ignored = ignored
 
         self.known_item = None
@@ -302,9 +308,10 @@ class LocationEntry(QStandardItem):
         self.updateText()
         self._parent.insertLocation(self)
 
-    def setPossible(self, possible):
-        if possible == self.possible:
+    def setPossible(self, possible, keys_needed=None):
+        if possible == self.possible and keys_needed == self.keys_needed:
             return
+        self.keys_needed = keys_needed
         if possible == 2:
             color = QColor(20, 20, 255)
         elif possible:
@@ -339,6 +346,8 @@ class LocationEntry(QStandardItem):
             text += ") ("
         text += self.neighborhood
         text += ")"
+        if self.possible == 2 and self.keys_needed:
+            text += " (" + keysNeededText(*self.keys_needed) + ")"
 
         self.setForeground(color)
         self.setText(text)
@@ -356,34 +365,53 @@ class LocationEntry(QStandardItem):
         return False
 
     def openMenu(self, parent, position):
+        gui = parent.parent_gui
+        multiworld = len(gui.worlds) > 1
+        if self.type != 'Shop' and not multiworld:
+            return
+        menu = QMenu(parent.widget)
+        entries = []
         if self.type == 'Shop':
-            menu = QMenu(parent.widget)
-            entries = []
             entries.append(menu.addAction("0-99 Rupees"))
             entries.append(menu.addAction("100-200 Rupees"))
             entries.append(menu.addAction("201-500 Rupees"))
-            chosen_action = menu.exec_(parent.widget.mapToGlobal(position))
-            if chosen_action is None:
-                return
-            chosen = entries.index(chosen_action)
-            logging.info("User has indicated that {} needs {} wallets".format(self.loc_name, chosen))
-            parent.parent_gui.updateLocationWallets(self.loc_name, chosen)
+        send_action = menu.addAction("Sends an item to another world...") if multiworld else None
+        chosen_action = menu.exec_(parent.widget.mapToGlobal(position))
+        if chosen_action is None:
             return
-        else:
-            raise Exception("Unknown location type for context menu")
-
-def originOfExit(exit_name):
-    match = re.fullmatch("(.*) -> (.*)", exit_name)
-    assert match
-    return match.group(1)
+        if chosen_action is send_action:
+            self.sendItemDialog(parent)
+            return
+        chosen = entries.index(chosen_action)
+        logging.info("User has indicated that {} needs {} wallets".format(self.loc_name, chosen))
+        gui.updateLocationWallets(self.loc_name, chosen)
+
+    # Ask which item this location has for which other world of a multiworld seed
+    def sendItemDialog(self, parent):
+        gui = parent.parent_gui
+        world_ids = [world_id for world_id in range(len(gui.worlds)) if world_id != gui.world_id]
+        names = ["World {}".format(world_id + 1) for world_id in world_ids]
+        name, ok = QInputDialog.getItem(parent.widget, "Send Item", "{} has an item for:".format(self.loc_name), names, 0, False)
+        if not ok:
+            return
+        items = sorted(ItemList.item_table)
+        item_name, ok = QInputDialog.getItem(parent.widget, "Send Item", "The item is:", items, 0, True)
+        if not ok:
+            return
+        if item_name not in ItemList.item_table:
+            logging.error("Unknown item {}".format(item_name))
+            return
+        gui.addSentItem(self.loc_name, item_name, world_ids[names.index(name)])
 
-def nthOfEST(types, n):
-    est = EntranceShuffle.entrance_shuffle_table
-    return [x[n][0] for x in est if x[0] in types]
+# "needs 2 Forest Temple keys", from ('Small Key (Forest Temple)', 2)
+def keysNeededText(key, count):
+    match = re.match(r"Small Key \((.*)\)", key)
+    name = match.group(1) if match else key
+    return "needs {} {} key{}".format(count, name, "" if count == 1 else "s")
 
 interior_regions = {}
-for exit in nthOfEST(['Interior', 'SpecialInterior', 'Grotto', 'Grave', 'SpecialGrave', 'ChildBoss', 'AdultBoss'], 2):
-    region = originOfExit(exit)
+for exit in EntranceIndex.getIndex().namesOfTypes(['Interior', 'SpecialInterior', 'Grotto', 'Grave', 'SpecialGrave', 'ChildBoss', 'AdultBoss'], 2):
+    region = EntranceIndex.getIndex().source(exit)
     interior_regions[region] = exit
 
 
@@ -447,9 +475,7 @@ def getNeighborhood(region, world):
     if region in redirect_region:
         return getNeighborhood(redirect_region[region], world)
     if region in interior_regions and not getattr(world.settings, 'decouple_entrances', False):
-        region_obj = world.get_region(region)
-        exit_name = interior_regions[region]
-        exit = expectOne([x for x in region_obj.exits if x.name == exit_name])
+        exit = getEntranceGraph(world).exit(interior_regions[region])
         if exit.shuffled:
             # TODO: if there is a multi-region interior, can we connect it to a different un-shuffled entrance?
             return "Unknown"
@@ -0,0 +1,115 @@
+import logging
+import multiprocessing
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import HoodTracker
+import RuleCompiler
+import WorldSnapshot
+
+# Worker processes for generating the worlds of a multiworld seed (None is one per CPU, 1 generates them one by one)
+processes = None
+
+# Each world has its own save file: the first world uses the tracker's file, and world N uses <file>_worldN
+def worldFilename(filename, world_id):
+    if world_id == 0:
+        return filename
+    root, ext = os.path.splitext(filename)
+    return "{}_world{}{}".format(root, world_id + 1, ext)
+
+# The save data of every world in the seed, with the settings string of the first one
+def readWorldsData(filename, input_data, gui_dialog=False):
+    world_count = HoodTracker.getSettings(input_data, gui_dialog=gui_dialog).world_count
+    input_datas = [input_data]
+    for world_id in range(1, world_count):
+        data = HoodTracker.getInputData(worldFilename(filename, world_id))
+        data['settings_string'] = input_data['settings_string'][:]
+        input_datas.append(data)
+    return input_datas
+
+# Workers are started fresh rather than forked (the GUI generates from a thread, and forking with Qt's threads running can deadlock),
+# so they are handed the cache folders that the command line may have changed
+def initWorker(rule_cache_dir, world_cache_dir):
+    RuleCompiler.cache_dir = rule_cache_dir
+    WorldSnapshot.snapshot_dir = world_cache_dir
+
+# Runs in a worker process; the world comes back as bytes since it can't be pickled the usual way
+def buildWorld(input_data, world_id):
+    world = HoodTracker.generate(input_data, gui_dialog=False, world_id=world_id)
+    world.rule_compiler.save()
+    return input_data, WorldSnapshot.dumps(world)
+
+# Generate every world at once in a process pool, then finish each one with its own save data
+# If the pool can't be used, the worlds are generated one by one instead
+def generateWorlds(input_datas):
+    worlds = None
+    if len(input_datas) > 1 and processes != 1:
+        try:
+            with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=initWorker, initargs=(RuleCompiler.cache_dir, WorldSnapshot.snapshot_dir)) as pool:
+                futures = [pool.submit(buildWorld, input_data, world_id) for world_id, input_data in enumerate(input_datas)]
+                results = [future.result() for future in futures]
+            worlds = []
+            for input_data, (built_input_data, data) in zip(input_datas, results):
+                input_data.update(built_input_data)
+                worlds.append(WorldSnapshot.loads(data))
+        except Exception as e:
+            logging.warning("Couldn't generate the worlds in parallel, so generating them one by one: {}".format(e))
+            worlds = None
+    if worlds is None:
+        worlds = [HoodTracker.generate(input_data, gui_dialog=False, world_id=world_id) for world_id, input_data in enumerate(input_datas)]
+    return [HoodTracker.finishWorld(world, input_data) for world, input_data in zip(worlds, input_datas)]
+
+# "<location> gives <item> to world <N>" in a world's sent_items, counted once its location is checked off
+sent_item_pattern = re.compile(r"(.*) gives (.*) to world (\d+)")
+
+# The items that other worlds have found for this one
+def receivedItems(world_id, input_datas):
+    received = Counter()
+    for sender_id, input_data in enumerate(input_datas):
+        if sender_id == world_id:
+            continue
+        checked_off = set(input_data['checked_off'])
+        for line in input_data.get('sent_items', []):
+            match = sent_item_pattern.fullmatch(line)
+            if match is None:
+                logging.warning("Can't read sent item \"{}\" of world {}".format(line, sender_id + 1))
+                continue
+            location, item, receiver = match.groups()
+            if int(receiver) - 1 == world_id and location in checked_off:
+                received[item] += 1
+    return received
+
+# A world's inventory (its saved equipment, unless given) plus what the others have sent it
+def progItems(input_datas, world_id, prog_items=None):
+    if prog_items is None:
+        prog_items = HoodTracker.equipmentProgItems(input_datas[world_id]['equipment'])
+    return prog_items + receivedItems(world_id, input_datas)
+
+# Solve every world and write its own save file
+# Each world needs its ExploreLogic (or the GUI's ExploreManager) to have put its known exits in place first
+def writeWorlds(worlds, input_datas, explore_logics, filename, prog_items=None, cache=None):
+    for world_id, (world, input_data, explore_logic) in enumerate(zip(worlds, input_datas, explore_logics)):
+        items = progItems(input_datas, world_id, prog_items[world_id] if prog_items else None)
+        output_data = HoodTracker.solve(world, items, cache=cache)
+        output_known_exits, output_known_exit_pairs = explore_logic.get_output()
+        HoodTracker.writeResultsToFile(world, input_data, output_data, output_known_exits, worldFilename(filename, world_id), output_known_exit_pairs)
+
+def textmode(filename, input_data, spoiler=None):
+    import ExploreLogic
+    input_datas = readWorldsData(filename, input_data)
+    worlds = generateWorlds(input_datas)
+    explore_logics = [ExploreLogic.ExploreLogic(world, data) for world, data in zip(worlds, input_datas)]
+    if spoiler:
+        import SpoilerImport
+        import Transaction
+        # Each world takes its own part of the file; the world may be generated again for it
+        data = SpoilerImport.readFile(spoiler)
+        for world_id, (world, world_data, explore_logic) in enumerate(zip(worlds, input_datas, explore_logics)):
+            tracker = Transaction.TextTracker(world, world_data, explore_logic)
+            SpoilerImport.importData(tracker, data, world_id=world_id)
+            worlds[world_id] = tracker.world
+            explore_logics[world_id] = tracker.explore_logic
+    writeWorlds(worlds, input_datas, explore_logics, filename)
@@ -0,0 +1,255 @@
+import logging
+import os
+import re
+
+import HoodTracker
+from EntranceGraph import getEntranceGraph
+
+# The dungeon that each skipped trial is in
+trials_dungeon = 'Ganons Castle'
+
+# Settings that only decide which exits are shuffled
+entrance_settings = {
+    'shuffle_interior_entrances',
+    'shuffle_grotto_entrances',
+    'shuffle_dungeon_entrances',
+    'shuffle_overworld_entrances',
+    'shuffle_bosses',
+    'owl_drops',
+    'warp_songs',
+    'spawn_positions',
+    'mix_entrance_pools',
+    'decouple_entrances',
+}
+
+# World attributes that generate() sets itself instead of leaving them as World worked them out from the settings
+generated_world_attributes = {'ensure_tod_access'}
+
+def dungeonName(region):
+    return getattr(region.dungeon, 'name', region.dungeon)
+
+# Apply a change to one of the dungeon choices (the input_data key and its new value) to the world we already have
+# Returns False if the change can't be made in place, and then the world has to be generated again
+# Empty dungeons only change a flag; skipped trials and dungeon shortcuts are read by the rule parser,
+# so the rules of the dungeons they touch are parsed again; MQ dungeons have different regions, so those are swapped
+# (which numbers the exits again, so the explore state has to be set up again from the save data, see Transaction)
+def reconfigure(world, input_data, key, data):
+    old_data = input_data[key]
+    input_data[key] = data
+    if sorted(old_data) == sorted(data):
+        return True
+
+    if key == 'empty_dungeons':
+        if world.settings.empty_dungeons_mode == 'specific':
+            return False
+        HoodTracker.determine_empty_dungeons(world, input_data)
+        return True
+    elif key == 'skipped_trials':
+        spots = spotsToReparse(world, [trials_dungeon], [key])
+        if spots is None:
+            return False
+        HoodTracker.determine_trials(world, input_data)
+        reparseRules(world, spots, [key])
+        return True
+    elif key == 'dungeon_shortcuts':
+        spots = spotsToReparse(world, set(old_data) ^ set(data), [key])
+        if spots is None:
+            return False
+        HoodTracker.determine_dungeon_shortcuts(world, input_data)
+        reparseRules(world, spots, [key])
+        return True
+    elif key == 'dungeon_mqs':
+        return swapDungeons(world, input_data, set(old_data) ^ set(data))
+    return False
+
+# Replace the regions of these dungeons with those of their other version (vanilla or MQ), loaded the way generate() loads them
+# Returns False, before changing the world, if that can't be done in place
+def swapDungeons(world, input_data, dungeons):
+    import Utils
+    import LocationLogic
+    read_json = getattr(Utils, 'read_json', None)
+    if read_json is None or not hasattr(world, 'load_regions_from_json'):
+        return False
+    mq_dungeons = set(input_data['dungeon_mqs'])
+    path = HoodTracker.logicPath(world.settings)
+    filenames = [os.path.join(path, name + (' MQ' if name in mq_dungeons else '') + '.json') for name in sorted(dungeons)]
+
+    # Regions outside the dungeon lead into it by name, so those names have to be in the other version too
+    old_regions = [region for region in world.regions if dungeonName(region) in dungeons]
+    old_names = set(region.name for region in old_regions)
+    new_names = set()
+    event_aliases = eventAliases()
+    for filename in filenames:
+        for region in read_json(filename):
+            new_names.add(region['region_name'])
+            # here() and at() only become event locations when the world is generated (create_internal_locations)
+            rule_strings = [rule for key in ['events', 'locations', 'exits'] for rule in region.get(key, {}).values()]
+            if any(makesEvents(rule, event_aliases) for rule in rule_strings):
+                logging.info("Generating the world again, since {} makes events".format(region['region_name']))
+                return False
+    leading_in = set(exit.connected_region for region in world.regions if region.name not in old_names for exit in region.exits)
+    missing = (leading_in & old_names) - new_names
+    if missing:
+        logging.info("Generating the world again, since {} would be left without {}".format(', '.join(sorted(dungeons)), ', '.join(sorted(missing))))
+        return False
+
+    # The known exits go back to vanilla; the explore state puts them back from the save data
+    entrances = getEntranceGraph(world)
+    for exit_id, known in enumerate(entrances.known):
+        if known:
+            entrances.restore(exit_id)
+
+    HoodTracker.determine_mq_dungeons(world, input_data)
+    first_new = len(world.regions)
+    for filename in filenames:
+        world.load_regions_from_json(filename)
+    new_regions = world.regions[first_new:]
+    old_regions = set(old_regions)
+    world.regions[:] = [region for region in world.regions if region not in old_regions]
+    for dungeon in getattr(world, 'dungeons', []):
+        if dungeon.name in dungeons:
+            dungeon.regions = [region for region in new_regions if dungeonName(region) == dungeon.name]
+            for region in dungeon.regions:
+                region.dungeon = dungeon
+    # World looks regions and locations up through caches that still have the old ones
+    world._cached_locations = None
+    for cache in ['_region_cache', '_location_cache', '_entrance_cache']:
+        if hasattr(world, cache):
+            setattr(world, cache, {})
+
+    locations = [loc for region in new_regions for loc in region.locations]
+    HoodTracker.placeFixedItems(world, locations)
+    LocationLogic.populateGSTokens(world)
+    world.rule_compiler.flatten([spot for region in new_regions for spot in region.exits + region.locations])
+
+    # The exits are numbered again for the new regions, and shuffled as for a new world
+    world.region_graph = None
+    world.entrance_graph = None
+    HoodTracker.shuffleExits(world)
+    HoodTracker.rulesChanged(world)
+    logging.info("Swapped {} in place ({} regions replaced with {})".format(', '.join(sorted(dungeons)), len(old_regions), len(new_regions)))
+    return True
+
+# What differs between two settings, sorted by how much of the world has to change for it:
+# 'tricks' only need the rules that read them parsed again, 'entrances' also need the exits shuffled again,
+# and 'structure' is anything else in the settings string, which needs the world generated again
+def diffSettings(old_settings, new_settings):
+    import SettingsList
+    trick_names = set(trick['name'] for trick in SettingsList.logic_tricks.values())
+    trick_names.add('allowed_tricks')
+    names = [setting.name for setting in SettingsList.setting_infos if setting.shared]
+    changes = {'tricks': set(), 'entrances': set(), 'structure': set()}
+    for name in set(names) | trick_names:
+        if getattr(old_settings, name, None) == getattr(new_settings, name, None):
+            continue
+        if name in trick_names:
+            changes['tricks'].add(name)
+        elif name in entrance_settings:
+            changes['entrances'].add(name)
+        else:
+            changes['structure'].add(name)
+    return changes
+
+# The plain values that World works out from the settings when it is made, which the rules can read too
+def worldAttributes(world):
+    return {name: value for name, value in world.__dict__.items()
+            if isinstance(value, (bool, int, str)) and name not in generated_world_attributes}
+
+# Apply a new settings string to the world we already have
+# Returns the changes from diffSettings(), or None if the world has to be generated again
+# Raises BadSettingsStringException like getSettings() does
+def reconfigureSettings(world, input_data, settings_string):
+    from World import World
+    old_settings = HoodTracker.getSettings({'settings_string': [world.settings.settings_string]})
+    new_settings = HoodTracker.getSettings({'settings_string': [settings_string]})
+    HoodTracker.setTrickFlags(old_settings)
+    HoodTracker.setTrickFlags(new_settings)
+    input_data['settings_string'] = [settings_string]
+    changes = diffSettings(old_settings, new_settings)
+    if changes['structure']:
+        logging.info("Generating the world again for {}".format(', '.join(sorted(changes['structure']))))
+        return None
+
+    # Settings can also change what World worked out from them, e.g. world.entrance_shuffle
+    old_attributes = worldAttributes(World(world.id, old_settings, resolveRandomizedSettings=False))
+    new_attributes = worldAttributes(World(world.id, new_settings, resolveRandomizedSettings=False))
+    changed_attributes = [name for name, value in new_attributes.items() if old_attributes.get(name) != value]
+    changed_names = changes['tricks'] | changes['entrances'] | set(changed_attributes)
+    spots = spotsToReparse(world, [], changed_names) if changed_names else []
+    if spots is None:
+        return None
+
+    for name in changes['tricks'] | changes['entrances']:
+        setattr(world.settings, name, getattr(new_settings, name))
+    for name in changed_attributes:
+        setattr(world, name, new_attributes[name])
+    world.settings.settings_string = new_settings.settings_string
+    if spots:
+        reparseRules(world, spots, changed_names)
+    if changes['entrances']:
+        HoodTracker.shuffleExits(world)
+    return changes
+
+# The names a rule can read these settings through: the settings themselves, and the LogicHelpers.json helpers using them
+def namesUsing(setting_names):
+    import RuleParser
+    rule_aliases = getattr(RuleParser, 'rule_aliases', {})
+    names = set(setting_names)
+    added = True
+    while added:
+        added = False
+        for alias, (_, replacement) in rule_aliases.items():
+            if alias not in names and any(name in replacement for name in names):
+                names.add(alias)
+                added = True
+    return names
+
+# Rules using here() or at() make new events, which only generating the world handles
+event_functions = re.compile(r"\b(here|at)\(")
+
+def makesEvents(rule_string, event_aliases):
+    return event_functions.search(rule_string) is not None or any(alias in rule_string for alias in event_aliases)
+
+# The LogicHelpers.json helpers that make events
+def eventAliases():
+    import RuleParser
+    rule_aliases = getattr(RuleParser, 'rule_aliases', {})
+    return set(alias for alias, (_, replacement) in rule_aliases.items() if makesEvents(replacement, ()))
+
+# The spots in these dungeons, and any other spot whose rule mentions one of the settings
+# Returns None if any of them can't be parsed again in place, so that the caller can refuse before changing anything
+def spotsToReparse(world, dungeons, setting_names):
+    if not hasattr(world.parser, 'parse_spot_rule'):
+        return None
+    event_aliases = eventAliases()
+
+    names = namesUsing(setting_names)
+    spots = []
+    for region in world.regions:
+        in_dungeon = dungeonName(region) in dungeons
+        for spot in region.exits + region.locations:
+            rule_string = getattr(spot, 'rule_string', None)
+            if in_dungeon or (rule_string is not None and any(name in rule_string for name in names)):
+                if rule_string is None or makesEvents(rule_string, event_aliases):
+                    return None
+                spots.append(spot)
+    return spots
+
+# Parse again the rules of these spots (from spotsToReparse()) with the settings as they are now
+# parse_spot_rule() replaces all of a spot's rules, so the ones added on top of the parsed rule
+# (shop rules, see LocationLogic.populateVanillaShop, and wallet requirements) are added again
+def reparseRules(world, spots, setting_names):
+    parser = world.parser
+    for spot in spots:
+        parser.parse_spot_rule(spot)
+        for rule in getattr(spot, 'added_rules', []):
+            spot.add_rule(rule)
+        spot.base_access_rule = None
+
+    world.rule_compiler.flatten(spots)
+    for loc in spots:
+        wallets = world.wallet_requirements.get(loc.name)
+        if wallets:
+            HoodTracker.setWalletRequirement(world, loc, wallets)
+    HoodTracker.rulesChanged(world)
+    logging.info("Parsed {} rules again for {}".format(len(spots), ', '.join(sorted(setting_names))))
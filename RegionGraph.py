@@ -0,0 +1,128 @@
+from Region import TimeOfDay
+
+# Marks a region as reached in ReachedRegions, on top of its TimeOfDay flags
+REACHED = 0x80
+ALL_TOD = TimeOfDay.DAY | TimeOfDay.DAMPE
+
+# The world's regions and exits numbered densely, with every exit's destination resolved to a region number
+# The solver works with these numbers so that its hot loop does no name lookups
+# Built once per world; exits connected or reshuffled through EntranceGraph are picked up by refresh_exit(),
+# and sync() picks up any changed some other way
+class RegionGraph:
+    def __init__(self, world):
+        self.world = world
+        self.regions = list(world.regions)
+        self.region_ids = {region: i for i, region in enumerate(self.regions)}
+        self.exits = [exit for region in self.regions for exit in region.exits]
+        self.exit_ids = {exit: i for i, exit in enumerate(self.exits)}
+        self.exit_sources = [self.region_ids[exit.parent_region] for exit in self.exits]
+        self.region_exits = [[self.exit_ids[exit] for exit in region.exits] for region in self.regions]
+        self.region_locations = [list(region.locations) for region in self.regions]
+        self.provides_time = bytearray(region.provides_time for region in self.regions)
+        self.connections = [(exit.shuffled, exit.connected_region) for exit in self.exits]
+        self.destinations = [self.resolve(exit) for exit in self.exits]
+        # A count of exit refreshes, and the count at each exit's last refresh, so that a solve can find what changed since
+        # the last one; this keeps one entry per exit however long the session goes on
+        self.version = 0
+        self.changed = {}
+        self.root = self.region_ids[world.get_region('Root')]
+
+    # Region number that an exit leads to, or -1 while it is shuffled
+    def resolve(self, exit):
+        if exit.shuffled or exit.connected_region is None:
+            return -1
+        return self.region_ids[self.world.get_region(exit.connected_region)]
+
+    def refresh_exit(self, exit):
+        exit_id = self.exit_ids[exit]
+        self.connections[exit_id] = (exit.shuffled, exit.connected_region)
+        self.destinations[exit_id] = self.resolve(exit)
+        self.version += 1
+        self.changed[exit_id] = self.version
+
+    # The exits refreshed since the count was at this version, in exit order
+    def changed_since(self, version):
+        return sorted(exit_id for exit_id, changed in self.changed.items() if changed > version)
+
+    # Pick up any exits that were connected or reshuffled without refresh_exit()
+    def sync(self):
+        for exit_id, exit in enumerate(self.exits):
+            if self.connections[exit_id] != (exit.shuffled, exit.connected_region):
+                self.refresh_exit(exit)
+
+    def region_id(self, region):
+        return self.region_ids[self.world.get_region(region)]
+
+# The graph for this world, built on first use
+def getRegionGraph(world):
+    graph = getattr(world, 'region_graph', None)
+    if graph is None or len(graph.regions) != len(world.regions):
+        graph = RegionGraph(world)
+        world.region_graph = graph
+    return graph
+
+# The regions one age has reached and the times of day it has there, one byte per region
+# The solver uses region numbers; the rest of the tracker can treat it like the old {Region: TimeOfDay} dict
+class ReachedRegions:
+    def __init__(self, graph):
+        self.graph = graph
+        self.flags = bytearray(len(graph.regions))
+        self.order = []
+
+    def copy(self):
+        other = ReachedRegions.__new__(ReachedRegions)
+        other.graph = self.graph
+        other.flags = self.flags[:]
+        other.order = self.order[:]
+        return other
+
+    # The region the search starts from, with no time of day
+    def start(self, region_id):
+        self.flags[region_id] = REACHED
+        self.order.append(region_id)
+
+    # Reach a region, and pass on any time of day it provides to Root
+    def reach(self, region_id):
+        tod = self.graph.provides_time[region_id]
+        self.flags[region_id] = REACHED | tod
+        self.order.append(region_id)
+        root = self.graph.root
+        if self.flags[root]:
+            self.flags[root] |= tod
+
+    def has(self, region_id):
+        return self.flags[region_id] != 0
+
+    def tod(self, region_id):
+        return self.flags[region_id] & ALL_TOD
+
+    def add_tod(self, region_id, tod):
+        self.flags[region_id] |= tod
+
+    # Region numbers reached after the first n, in the order they were reached
+    def since(self, n):
+        return self.order[n:]
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, region):
+        region_id = self.graph.region_ids.get(region)
+        return region_id is not None and self.flags[region_id] != 0
+
+    def __getitem__(self, region):
+        region_id = self.graph.region_ids[region]
+        if not self.flags[region_id]:
+            raise KeyError(region)
+        return self.flags[region_id] & ALL_TOD
+
+    def __iter__(self):
+        regions = self.graph.regions
+        return (regions[i] for i in self.order)
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        regions = self.graph.regions
+        return ((regions[i], self.flags[i] & ALL_TOD) for i in self.order)
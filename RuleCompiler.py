@@ -0,0 +1,206 @@
+import ast
+import hashlib
+import inspect
+import json
+import logging
+import marshal
+import os
+import sys
+import types
+
+# Bump this when the layout of the cache files changes
+RULE_CACHE_VERSION = 1
+
+# Where compiled rules are kept between sessions (None turns the disk cache off)
+cache_dir = 'RuleCache'
+
+# Only this many cache files are kept; the ones loaded or saved least recently are deleted first
+max_cache_files = 8
+
+# Everything that changes which rules the parser builds for this world
+def ruleCacheKey(world):
+    key = {
+        'version': RULE_CACHE_VERSION,
+        'python': sys.version,
+        'settings_string': world.settings.settings_string,
+        'dungeon_mqs': sorted(name for name, mq in world.dungeon_mq.items() if mq),
+        'skipped_trials': sorted(name for name, skipped in world.skipped_trials.items() if skipped),
+        'dungeon_shortcuts': sorted(world.settings.dungeon_shortcuts),
+        'empty_dungeons': sorted(world.settings.empty_dungeons_specific),
+        'tricks': sorted(world.settings.allowed_tricks),
+    }
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+# The argument list of a rule function, without its defaults (those are copied over after exec)
+def signatureOf(rule):
+    params = []
+    star = False
+    for p in inspect.signature(rule).parameters.values():
+        if p.kind == p.VAR_POSITIONAL:
+            params.append('*' + p.name)
+            star = True
+        elif p.kind == p.KEYWORD_ONLY:
+            if not star:
+                params.append('*')
+                star = True
+            params.append(p.name)
+        elif p.kind == p.VAR_KEYWORD:
+            params.append('**' + p.name)
+        else:
+            params.append(p.name)
+    return ', '.join(params)
+
+# Sits in front of the OoTR rule parser's make_access_rule()
+# Rules whose AST has been compiled in an earlier session are rebuilt from the saved bytecode instead of compiled again,
+# and once the world is built each spot's list of rules is merged into one flat function by flatten()
+class RuleCompiler:
+    def __init__(self, world):
+        self.world = world
+        self.filename = None
+        if cache_dir is not None:
+            self.filename = os.path.join(cache_dir, ruleCacheKey(world) + '.marshal')
+        self.cached = {}
+        self.cached_flat = {}
+        self.compiled = {}
+        self.flat = {}
+        self.functions = {}
+        self.sources = {}
+        self.template = None
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+        self.original = getattr(world.parser, 'make_access_rule', None)
+        if self.original is None:
+            logging.warning("This OoTR rule parser has no make_access_rule(), so rules won't be compiled")
+            return
+        world.parser.make_access_rule = self.make_access_rule
+
+    def make_access_rule(self, body):
+        key = hashlib.sha1(ast.dump(body).encode()).hexdigest()
+        rule = self.functions.get(key)
+        if rule is not None:
+            return rule
+
+        if key in self.cached and self.template is not None:
+            source, code = self.cached[key]
+            rule = types.FunctionType(code, self.template.__globals__, argdefs=self.template.__defaults__)
+            rule.__kwdefaults__ = self.template.__kwdefaults__
+            self.hits += 1
+        else:
+            source = ast.unparse(body) if hasattr(ast, 'unparse') else None
+            rule = self.original(body)
+            if key not in self.cached:
+                self.misses += 1
+            # Only plain functions with the parser's usual arguments can be saved and merged
+            if not isinstance(rule, types.FunctionType) or rule.__closure__:
+                return rule
+            if self.template is None:
+                self.template = rule
+            elif signatureOf(rule) != signatureOf(self.template):
+                return rule
+            code = rule.__code__
+
+        self.functions[key] = rule
+        self.compiled[key] = (source, code)
+        if source is not None:
+            self.sources[rule] = source
+        return rule
+
+    # Replace each spot that has several rules with one function that checks them all in one go
+    # Wallet requirements are added on top of the flattened rule afterwards (see HoodTracker.setWalletRequirement)
+    def flatten(self, spots):
+        if self.template is None:
+            return 0
+        defs = []
+        flattened = []
+        for spot in spots:
+            rules = getattr(spot, 'access_rules', None)
+            if not rules or len(rules) < 2 or any(rule not in self.sources for rule in rules):
+                continue
+            body = ' and '.join('({})'.format(self.sources[rule]) for rule in rules)
+            defs.append('def rule_{}({}):\n    return {}\n'.format(len(flattened), signatureOf(self.template), body))
+            flattened.append(spot)
+        if not flattened:
+            return 0
+
+        source = '\n'.join(defs)
+        key = hashlib.sha1(source.encode()).hexdigest()
+        code = self.cached_flat.get(key)
+        if code is None:
+            code = compile(source, '<flattened rules>', 'exec')
+        self.flat[key] = code
+
+        namespace = dict(self.template.__globals__)
+        exec(code, namespace)
+        for i, spot in enumerate(flattened):
+            rule = namespace['rule_{}'.format(i)]
+            rule.__defaults__ = self.template.__defaults__
+            rule.__kwdefaults__ = self.template.__kwdefaults__
+            spot.access_rule = rule
+        return len(flattened)
+
+    # World snapshots (see WorldSnapshot) leave out the compiled rules, which are in the rule cache file already
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['cached'] = {}
+        state['cached_flat'] = {}
+        state['compiled'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'rules': len(self.functions)}
+
+    def load(self):
+        if self.filename is None or not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, "rb") as f:
+                data = marshal.load(f)
+            os.utime(self.filename)
+        except (OSError, EOFError, ValueError, TypeError) as e:
+            logging.warning("Ignoring unreadable rule cache {}: {}".format(self.filename, e))
+            return
+        if data.get('version') != RULE_CACHE_VERSION:
+            return
+        self.cached = data['rules']
+        self.cached_flat = data['flat']
+        logging.info("Loaded {} compiled rules from {}".format(len(self.cached), self.filename))
+
+    # Only written when this session compiled something that wasn't in the file already
+    def save(self):
+        if self.filename is None or (self.misses == 0 and self.flat.keys() <= self.cached_flat.keys()):
+            return
+        data = {'version': RULE_CACHE_VERSION, 'rules': {**self.cached, **self.compiled}, 'flat': self.flat}
+        # Worlds with the same choices share a file, and multiworld workers can save at the same time,
+        # so each writes its own temporary file and swaps it in whole
+        temp_filename = "{}.{}.tmp".format(self.filename, os.getpid())
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(temp_filename, "wb") as f:
+                marshal.dump(data, f)
+            os.replace(temp_filename, self.filename)
+        except (OSError, ValueError) as e:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+            logging.warning("Couldn't save the rule cache {}: {}".format(self.filename, e))
+            return
+        logging.info("Saved {} compiled rules to {}".format(len(data['rules']), self.filename))
+        prune()
+
+# Every other set of choices (MQ dungeons, trials, shortcuts, tricks) gets a file of its own, so the oldest are deleted
+def prune():
+    try:
+        filenames = [os.path.join(cache_dir, x) for x in os.listdir(cache_dir) if x.endswith('.marshal')]
+        filenames.sort(key=os.path.getmtime, reverse=True)
+        for filename in filenames[max_cache_files:]:
+            os.remove(filename)
+    except OSError as e:
+        # Multiworld workers save at the same time, so another one may have deleted a file already
+        logging.warning("Couldn't prune the rule cache: {}".format(e))
@@ -0,0 +1,96 @@
+import json
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from EntranceGraph import getEntranceGraph
+
+# Bump this when the solver changes what it returns, so that old cache files are thrown away
+CACHE_VERSION = 3
+
+# Everything that a solve depends on, turned into one hash
+# (settings string, inventory, known exits, MQ / trials / shortcuts / empty dungeon choices, and wallet rules)
+def solveKey(world, prog_items, starting_region='Root'):
+    entrances = getEntranceGraph(world)
+    exits = sorted((exit.name, exit.shuffled, exit.connected_region) for exit, shuffled, known in zip(entrances.exits, entrances.shuffled, entrances.known)
+                   if shuffled or known)
+    key = {
+        'version': CACHE_VERSION,
+        'settings_string': world.settings.settings_string,
+        'starting_region': starting_region,
+        'prog_items': sorted((item, count) for item, count in prog_items.items() if count),
+        'exits': exits,
+        'dungeon_mqs': sorted(name for name, mq in world.dungeon_mq.items() if mq),
+        'skipped_trials': sorted(name for name, skipped in world.skipped_trials.items() if skipped),
+        'dungeon_shortcuts': sorted(world.settings.dungeon_shortcuts),
+        'empty_dungeons': sorted(world.settings.empty_dungeons_specific),
+        'wallet_requirements': sorted(getattr(world, 'wallet_requirements', {}).items()),
+    }
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+# Turn a solve() output into names only, so that it outlives the World it came from and can be saved to disk
+def resultToEntry(world, result):
+    return {
+        'possible_locations': [x.name for x in result['possible_locations']],
+        'allkeys_possible_locations': [x.name for x in result['allkeys_possible_locations']],
+        'small_keys_needed': [[x.name, key, count] for x, (key, count) in result['small_keys_needed'].items()],
+        'adult_reached': [[x.name, tod] for x, tod in result['adult_reached'].items()],
+        'child_reached': [[x.name, tod] for x, tod in result['child_reached'].items()],
+        'please_explore': getEntranceGraph(world).exploreNames(),
+        'prog_items': dict(world.state.prog_items),
+    }
+
+# Bounded LRU cache of solve() outputs, optionally kept in a file between sessions
+class SolveCache:
+    def __init__(self, max_entries=64, filename=None):
+        self.max_entries = max_entries
+        self.filename = filename
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if filename is not None:
+            self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries)}
+
+    def load(self):
+        if not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable solve cache {}: {}".format(self.filename, e))
+            return
+        if data.get('version') != CACHE_VERSION:
+            logging.info("Discarding solve cache {} from an older version".format(self.filename))
+            return
+        for key, entry in data['entries']:
+            self.put(key, entry)
+        logging.info("Loaded {} solves from {}".format(len(self.entries), self.filename))
+
+    def save(self):
+        if self.filename is None:
+            return
+        data = {'version': CACHE_VERSION, 'entries': list(self.entries.items())}
+        with open(self.filename, "w") as f:
+            json.dump(data, f)
+        logging.info("Saved {} solves to {}".format(len(self.entries), self.filename))
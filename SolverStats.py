@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Turned on by --solver_stats or by setting HOODTRACKER_SOLVER_STATS (to 1, or to a file to append json lines to)
+# While this is off, solve() doesn't create a SolverStats and the solver runs exactly as without it
+environment_setting = os.environ.get('HOODTRACKER_SOLVER_STATS', '')
+enabled = environment_setting not in ('', '0')
+output_filename = environment_setting if enabled and environment_setting != '1' else None
+
+# How many rules to list in the "most expensive" part of the report
+top_rule_count = 10
+
+# Where one solve spent its time
+# Phase times are inclusive, so e.g. the all-keys pass also counts in filterRegions and filterLocations,
+# and a rule's time includes any rules it checked through can_reach()
+class SolverStats:
+    def __init__(self):
+        self.phase_seconds = Counter()
+        self.phase_calls = Counter()
+        self.passes = 0
+        self.rule_calls = Counter()
+        self.rule_seconds = Counter()
+        self.calls_by_kind = Counter()
+        self.cache_hit = False
+        self.watched = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] += time.perf_counter() - start
+            self.phase_calls[name] += 1
+
+    # Time a bound method of one object as a phase, for as long as that object lives
+    def watchMethod(self, obj, name):
+        method = getattr(obj, name)
+        def timed_method(*args, **kwargs):
+            with self.phase(name):
+                return method(*args, **kwargs)
+        setattr(obj, name, timed_method)
+
+    # Time every exit's and location's access_rule until unwatchRules()
+    def watchRules(self, world):
+        for region in world.regions:
+            for kind, spots in [('exit', region.exits), ('location', region.locations)]:
+                for spot in spots:
+                    if spot in self.watched:
+                        continue
+                    self.watched[spot] = spot.access_rule
+                    spot.access_rule = self.timedRule(spot.access_rule, (kind, spot.name))
+
+    def timedRule(self, rule, key):
+        def timed_rule(state, **kwargs):
+            start = time.perf_counter()
+            try:
+                return rule(state, **kwargs)
+            finally:
+                self.rule_seconds[key] += time.perf_counter() - start
+                self.rule_calls[key] += 1
+                self.calls_by_kind[key[0]] += 1
+        return timed_rule
+
+    def unwatchRules(self):
+        for spot, rule in self.watched.items():
+            spot.access_rule = rule
+        self.watched = {}
+
+    def top_rules(self, n=None):
+        n = top_rule_count if n is None else n
+        return [{'kind': kind, 'name': name, 'calls': self.rule_calls[(kind, name)], 'seconds': seconds}
+                for (kind, name), seconds in self.rule_seconds.most_common(n)]
+
+    def to_json(self):
+        return {
+            'cache_hit': self.cache_hit,
+            'passes': self.passes,
+            'phase_seconds': dict(self.phase_seconds),
+            'phase_calls': dict(self.phase_calls),
+            'rule_calls': dict(self.calls_by_kind),
+            'top_rules': self.top_rules(),
+            'spot_rule_calls': self.spot_rule_calls(),
+        }
+
+    # Every exit's and location's access_rule call count, as {kind: {name: calls}}
+    def spot_rule_calls(self):
+        calls = {}
+        for (kind, name), count in self.rule_calls.items():
+            calls.setdefault(kind, {})[name] = count
+        return calls
+
+    def log(self):
+        if self.cache_hit:
+            logging.info("Solver stats: cache hit")
+        else:
+            phases = ", ".join("{} {:.1f}ms".format(name, seconds * 1000) for name, seconds in self.phase_seconds.most_common())
+            logging.info("Solver stats: {} passes, {} exit and {} location rule calls; {}".format(
+                self.passes, self.calls_by_kind['exit'], self.calls_by_kind['location'], phases))
+            for rule in self.top_rules():
+                logging.info("    {kind} {name}: {calls} calls, {seconds:.4f}s".format(**rule))
+        data = json.dumps(self.to_json())
+        logging.info("Solver stats json: " + data)
+        if output_filename is not None:
+            with open(output_filename, "a") as f:
+                f.write(data + "\n")
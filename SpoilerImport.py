@@ -0,0 +1,137 @@
+import json
+import logging
+import re
+
+# Bring what a tracker can use from an OoT-Randomizer spoiler log or plando file (they are the same json format) into the tracked world:
+# the MQ dungeons, the skipped trials, where the shuffled entrances lead, shop prices as wallet requirements, and the starting items
+# The item placements themselves are left alone, since finding them is what the tracker is for
+# Everything goes in as one Transaction, so the world is solved (or generated again) only once
+
+def readFile(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+world_key = re.compile(r"World \d+")
+
+# The part of a section for this world; in a multiworld file every section has a "World N" level
+def worldSection(data, key, world_id):
+    section = data.get(key)
+    if isinstance(section, dict) and any(world_key.fullmatch(name) for name in section):
+        return section.get("World {}".format(world_id + 1))
+    return section
+
+# What a shop item costs, as the wallet upgrades it needs
+def walletsForPrice(price):
+    if price <= 99:
+        return 0
+    if price <= 200:
+        return 1
+    return 2
+
+# Where an exit leads, named the way the explore panel does: a region, or "<region> (from <region>)" for an entrance that has more than one way in
+# Owl drops, warp songs and spawns are named by their region alone, even where the file says which way in they land at
+def destinationName(explore_logic, exit_id, target):
+    if not isinstance(target, dict):
+        return target
+    pool = explore_logic.entrances.pools[exit_id]
+    if pool is explore_logic.owl_pool or pool is explore_logic.spawn_warp_pool:
+        return target['region']
+    return "{} (from {})".format(target['region'], target['from'])
+
+def importFile(tracker, filename, world_id=0):
+    logging.info("Importing {}".format(filename))
+    return importData(tracker, readFile(filename), world_id=world_id)
+
+# Returns how many of each kind of thing were imported
+def importData(tracker, data, world_id=0):
+    counts = {}
+    with tracker.begin() as transaction:
+        counts['dungeons'] = importDungeons(transaction, data, world_id)
+        counts['trials'] = importTrials(transaction, data, world_id)
+        counts['entrances'] = importEntrances(transaction, data, world_id)
+        counts['wallets'] = importWallets(transaction, data, world_id)
+        counts['items'] = importStartingItems(transaction, data, world_id)
+    logging.info("Imported {dungeons} dungeons, {trials} trials, {entrances} entrances, {wallets} shop prices and {items} starting items".format(**counts))
+    return counts
+
+def importDungeons(transaction, data, world_id):
+    dungeons = worldSection(data, 'dungeons', world_id)
+    if not dungeons:
+        return 0
+    world = transaction.world
+    mqs = [name for name in world.dungeon_mq if dungeons.get(name) == 'mq']
+    transaction.setChoices('dungeon_mqs', mqs)
+    return len([name for name in world.dungeon_mq if name in dungeons])
+
+def importTrials(transaction, data, world_id):
+    trials = worldSection(data, 'trials', world_id)
+    if not trials:
+        return 0
+    world = transaction.world
+    skipped = [name for name in world.skipped_trials if trials.get(name) == 'inactive']
+    transaction.setChoices('skipped_trials', skipped)
+    return len([name for name in world.skipped_trials if name in trials])
+
+def importEntrances(transaction, data, world_id):
+    entrances = worldSection(data, 'entrances', world_id)
+    if not entrances:
+        return 0
+    explore_logic = transaction.explore_logic
+    graph = explore_logic.entrances
+    count = 0
+    for exit_name, target in entrances.items():
+        exit_id = graph.ids.get(exit_name)
+        if exit_id is None:
+            logging.warning("Can't import entrance {}: there is no such exit".format(exit_name))
+            continue
+        if not graph.shuffled[exit_id]:
+            # Not shuffled with these settings, or already known (e.g. as the other half of a coupled pair)
+            continue
+        try:
+            transaction.setKnownExit(exit_name, destinationName(explore_logic, exit_id, target))
+        except (ValueError, KeyError, TypeError) as e:
+            logging.warning("Can't import entrance {} -> {}: {}".format(exit_name, target, e))
+            continue
+        count += 1
+    return count
+
+def importWallets(transaction, data, world_id):
+    placements = worldSection(data, 'locations', world_id)
+    if not placements:
+        return 0
+    world = transaction.world
+    shops = {loc.name: loc for loc in world.get_locations() if loc.type == 'Shop'}
+    count = 0
+    for name, placement in placements.items():
+        if name not in shops or not isinstance(placement, dict) or 'price' not in placement:
+            continue
+        wallets = walletsForPrice(placement['price'])
+        if getattr(world, 'wallet_requirements', {}).get(name, 0) != wallets:
+            transaction.setWallets(name, wallets)
+        count += 1
+    return count
+
+def importStartingItems(transaction, data, world_id):
+    import InventoryManager
+    items = worldSection(data, 'starting_items', world_id)
+    if items is None:
+        items = worldSection(data.get('settings', {}), 'starting_items', world_id)
+    if not items:
+        return 0
+    limits = InventoryManager.getItemLimits(transaction.world)
+    mq_items = InventoryManager.get_mq_items(transaction.world)
+    trade_items = InventoryManager.adult_trade + InventoryManager.child_trade
+    count = 0
+    for name, amount in items.items():
+        if name in trade_items:
+            limit = 1
+        elif name in limits:
+            limit = InventoryManager.get_item_limit(name, mq_items)
+        else:
+            logging.warning("Can't import starting item {}: the tracker doesn't have it".format(name))
+            continue
+        have = transaction.input_data['equipment'].count(name)
+        wanted = min(max(have, amount), limit)
+        transaction.setItemCount(name, wanted)
+        count += 1
+    return count
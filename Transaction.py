@@ -0,0 +1,137 @@
+import logging
+
+import ExploreLogic
+import HoodTracker
+import Reconfigure
+from EntranceGraph import getEntranceGraph
+
+# A batch of changes to a tracked world, solved once when it is committed
+#
+#     transaction = tracker.begin()
+#     transaction.setItemCount('Bow', 1)
+#     transaction.setKnownExit('Kokiri Forest -> KF Links House', 'KF Midos House')
+#     transaction.commit()
+#
+# Each change goes into the save data straight away, and into the world and its ExploreLogic where that can be done in place.
+# A change that needs the world generated again (see Reconfigure.reconfigure) only marks the transaction, so that it is generated once;
+# an MQ dungeon swapped in place sets up the explore state again straight away, and the tracker lists the locations again.
+# The tracker (TextTracker below, or HoodTrackerGui) does the rest in commitTransaction(): at most one generate and one solve.
+class Transaction:
+    def __init__(self, tracker, world, input_data, explore_logic):
+        self.tracker = tracker
+        self.world = world
+        self.input_data = input_data
+        self.explore_logic = explore_logic
+        self.regenerate = False
+        # Set when a dungeon's regions were swapped in place, so the locations have to be listed again
+        self.reshaped = False
+        self.items_changed = False
+        self.open = True
+
+    def setItemCount(self, name, count):
+        equipment = self.input_data['equipment']
+        current = equipment.count(name)
+        if current == count:
+            return
+        if count > current:
+            equipment.extend([name] * (count - current))
+        else:
+            for _ in range(current - count):
+                equipment.remove(name)
+        self.items_changed = True
+
+    def collectItem(self, name, count=1):
+        self.setItemCount(name, self.input_data['equipment'].count(name) + count)
+
+    # The destination is named as the explore panel shows it (see ExploreLogic.setKnownExit)
+    # Raises ValueError if the exit can't go there; the GUI's ExploreManager only logs that for its own clicks, so it is gone around
+    def setKnownExit(self, exit_name, destination_name):
+        ExploreLogic.ExploreLogic.setKnownExit(self.explore_logic, exit_name, destination_name)
+
+    def forgetKnownExit(self, exit_name):
+        self.explore_logic.reshuffle_exit(exit_name)
+
+    # How many wallet upgrades a shop location needs (0 clears it)
+    def setWallets(self, location_name, wallets):
+        wallet_lists = {1: self.input_data['one_wallet'], 2: self.input_data['two_wallets']}
+        for count, wallet_list in wallet_lists.items():
+            while location_name in wallet_list:
+                wallet_list.remove(location_name)
+            if wallets == count:
+                wallet_list.append(location_name)
+        HoodTracker.setWalletRequirement(self.world, self.world.get_location(location_name), wallets)
+
+    # Set one of the dungeon choices ('dungeon_mqs', 'skipped_trials', 'dungeon_shortcuts' or 'empty_dungeons') to these names
+    def setChoices(self, key, names):
+        if self.regenerate:
+            # The world is going to be generated again anyway, which reads the save data
+            self.input_data[key] = list(names)
+            return
+        if key == 'dungeon_mqs':
+            # Swapping a dungeon numbers the exits again, and the explore state is set up again from the save data
+            self.input_data['known_exits'], self.input_data['paired_exits'] = self.explore_logic.get_output()
+        graph = getEntranceGraph(self.world)
+        if not Reconfigure.reconfigure(self.world, self.input_data, key, list(names)):
+            self.regenerate = True
+        elif getEntranceGraph(self.world) is not graph:
+            self.reshaped = True
+            self.explore_logic.set_up_world(self.world, self.input_data)
+
+    def setDungeonMQ(self, dungeon, mq):
+        self.setChoice('dungeon_mqs', dungeon, mq)
+
+    def setTrialSkipped(self, trial, skipped):
+        self.setChoice('skipped_trials', trial, skipped)
+
+    def setChoice(self, key, name, chosen):
+        names = [x for x in self.input_data.get(key, []) if x != name]
+        if chosen:
+            names.append(name)
+        self.setChoices(key, names)
+
+    def commit(self):
+        assert self.open
+        self.open = False
+        if self.regenerate:
+            # The new world takes its known exits from the save data
+            self.input_data['known_exits'], self.input_data['paired_exits'] = self.explore_logic.get_output()
+        self.tracker.commitTransaction(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.open:
+            return
+        # The changes made before an error stay made, so they are committed too;
+        # otherwise the world and save data would have moved on while the tracker still showed the last solve
+        if exc_type is not None:
+            logging.warning("Committing the changes made before an error: {}".format(exc_value))
+        self.commit()
+
+# The tracker for --textmode: one world and its save data, solved when a transaction is committed
+class TextTracker:
+    def __init__(self, world, input_data, explore_logic):
+        self.world = world
+        self.input_data = input_data
+        self.explore_logic = explore_logic
+        self.output_data = None
+
+    def begin(self):
+        return Transaction(self, self.world, self.input_data, self.explore_logic)
+
+    def commitTransaction(self, transaction):
+        if transaction.regenerate:
+            import ExploreLogic
+            self.world = HoodTracker.startWorldBasedOnData(self.input_data, gui_dialog=False, world_id=self.world.id)
+            self.explore_logic = ExploreLogic.ExploreLogic(self.world, self.input_data)
+            self.output_data = None
+        elif transaction.reshaped:
+            self.output_data = None
+        self.solve()
+
+    def solve(self, prog_items=None):
+        if prog_items is None:
+            prog_items = HoodTracker.equipmentProgItems(self.input_data['equipment'])
+        self.output_data = HoodTracker.solve(self.world, prog_items, previous=self.output_data)
+        return self.output_data
@@ -0,0 +1,150 @@
+import hashlib
+import importlib.util
+import io
+import json
+import logging
+import marshal
+import os
+import pickle
+import subprocess
+import sys
+import types
+
+# Bump this when generate() builds the world differently, so that old snapshots are thrown away
+SNAPSHOT_VERSION = 1
+
+# Where built worlds are kept between sessions (None turns snapshots off)
+snapshot_dir = 'WorldCache'
+
+# Only this many snapshots are kept; the ones loaded or saved least recently are deleted first
+max_snapshots = 8
+
+# The world graph is deep enough to need more than python's default recursion limit to pickle
+recursion_limit = 20000
+
+# Revision of the OoT-Randomizer submodule, worked out once per session
+ootr_revision = None
+
+# Keys that couldn't be pickled this session, so that they aren't tried again on every regenerate
+unpicklable = set()
+
+# The git commit of the OoTR checkout that World is imported from, or its version number if it isn't a git checkout
+def ootrRevision():
+    global ootr_revision
+    if ootr_revision is None:
+        ootr_dir = os.path.dirname(os.path.abspath(importlib.util.find_spec('World').origin))
+        try:
+            ootr_revision = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ootr_dir, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            try:
+                from version import __version__
+                ootr_revision = __version__
+            except ImportError:
+                logging.warning("Can't tell which OoT-Randomizer revision this is, so saved worlds won't notice it changing")
+                ootr_revision = 'unknown'
+    return ootr_revision
+
+# Everything generate() builds the world from
+# Wallet rules are added after the snapshot is taken, so one snapshot serves every choice of wallets
+def snapshotKey(world):
+    key = {
+        'version': SNAPSHOT_VERSION,
+        'python': sys.version,
+        'ootr': ootrRevision(),
+        'settings_string': world.settings.settings_string,
+        'world_id': world.id,
+        'dungeon_mqs': sorted(name for name, mq in world.dungeon_mq.items() if mq),
+        'skipped_trials': sorted(name for name, skipped in world.skipped_trials.items() if skipped),
+        'dungeon_shortcuts': sorted(world.settings.dungeon_shortcuts),
+        'empty_dungeons': sorted(world.settings.empty_dungeons_specific),
+        'tricks': sorted(world.settings.allowed_tricks),
+    }
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+def snapshotFilename(key):
+    return os.path.join(snapshot_dir, key + '.pickle')
+
+# The rule parser makes its rules with eval(), so they can't be pickled by name like ordinary functions
+# They are saved as their bytecode instead, and rebuilt on load in the module they came from
+def rebuildFunction(module, code, name, defaults, kwdefaults):
+    function = types.FunctionType(marshal.loads(code), sys.modules[module].__dict__, name, defaults)
+    function.__kwdefaults__ = kwdefaults
+    return function
+
+def importableAs(function):
+    obj = sys.modules.get(function.__module__)
+    for part in function.__qualname__.split('.'):
+        obj = getattr(obj, part, None)
+    return obj
+
+class WorldPickler(pickle.Pickler):
+    def reducer_override(self, obj):
+        if type(obj) is not types.FunctionType or importableAs(obj) is obj:
+            return NotImplemented
+        if obj.__closure__ or obj.__module__ not in sys.modules:
+            raise pickle.PicklingError("Can't snapshot rule {}".format(obj.__qualname__))
+        return rebuildFunction, (obj.__module__, marshal.dumps(obj.__code__), obj.__name__, obj.__defaults__, obj.__kwdefaults__)
+
+# A world as bytes, e.g. to hand it back from another process (see Multiworld)
+def dumps(world):
+    f = io.BytesIO()
+    with RecursionLimit():
+        WorldPickler(f, pickle.HIGHEST_PROTOCOL).dump(world)
+    return f.getvalue()
+
+def loads(data):
+    with RecursionLimit():
+        return pickle.loads(data)
+
+class RecursionLimit:
+    def __enter__(self):
+        self.old_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(self.old_limit, recursion_limit))
+
+    def __exit__(self, *args):
+        sys.setrecursionlimit(self.old_limit)
+
+# The world saved under this key, or None if there isn't one yet
+def load(key):
+    if snapshot_dir is None:
+        return None
+    filename = snapshotFilename(key)
+    if not os.path.exists(filename):
+        return None
+    try:
+        with open(filename, "rb") as f, RecursionLimit():
+            snapshot = pickle.load(f)
+        os.utime(filename)
+    except Exception as e:
+        logging.warning("Ignoring unreadable world snapshot {}: {}".format(filename, e))
+        return None
+    logging.info("Loaded the world from {}".format(filename))
+    return snapshot
+
+def save(world, key):
+    # reducer_override() is new in python 3.8
+    if snapshot_dir is None or sys.version_info < (3, 8):
+        return
+    if key in unpicklable:
+        return
+    filename = snapshotFilename(key)
+    temp_filename = filename + '.tmp'
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        with open(temp_filename, "wb") as f, RecursionLimit():
+            WorldPickler(f, pickle.HIGHEST_PROTOCOL).dump(world)
+        os.replace(temp_filename, filename)
+    except Exception as e:
+        logging.warning("Couldn't snapshot the world: {}".format(e))
+        unpicklable.add(key)
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+        return
+    logging.info("Saved the world to {}".format(filename))
+    prune()
+
+def prune():
+    filenames = [os.path.join(snapshot_dir, x) for x in os.listdir(snapshot_dir) if x.endswith('.pickle')]
+    filenames.sort(key=os.path.getmtime, reverse=True)
+    for filename in filenames[max_snapshots:]:
+        os.remove(filename)
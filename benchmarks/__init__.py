@@ -0,0 +1 @@
+# Headless benchmarks of the tracker's hot paths: python -m benchmarks --help
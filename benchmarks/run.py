@@ -0,0 +1,195 @@
+import argparse
+import copy
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import HoodTracker
+import ExploreLogic
+import FindPath
+import RuleCompiler
+import TextSettings
+import WorldSnapshot
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(BENCHMARK_DIR, 'corpus')
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+# A corpus case is a json file with either a settings_string or settings (OoTR setting overrides of the defaults),
+# and optionally a save_file in the tracker's own save format, items to collect for an incremental solve,
+# and find_path routes as [start region, start age, destination region]
+def loadCase(filename):
+    with open(filename, "r") as f:
+        case = json.load(f)
+    case['name'] = os.path.splitext(os.path.basename(filename))[0]
+
+    input_data = {}
+    if 'save_file' in case:
+        input_data = TextSettings.readFromFile(os.path.join(os.path.dirname(filename), case['save_file']))
+    if 'settings_string' in case:
+        input_data['settings_string'] = [case['settings_string']]
+    else:
+        # Built from the overrides with this OoTR version, so the string is always one it can read
+        from Settings import Settings
+        input_data['settings_string'] = [Settings(case.get('settings', {})).get_settings_string()]
+    case['input_data'] = HoodTracker.completeInputData(input_data)
+    return case
+
+def loadCorpus(corpus_dir, names=None):
+    cases = []
+    for filename in sorted(os.listdir(corpus_dir)):
+        if not filename.endswith('.json'):
+            continue
+        if names and os.path.splitext(filename)[0] not in names:
+            continue
+        cases.append(loadCase(os.path.join(corpus_dir, filename)))
+    return cases
+
+# Count every access_rule call on the world's exits and locations while a phase runs
+class RuleCounter:
+    def __init__(self, world):
+        self.counts = {'exit': 0, 'location': 0}
+        self.originals = {}
+        for region in world.regions:
+            for kind, spots in [('exit', region.exits), ('location', region.locations)]:
+                for spot in spots:
+                    self.originals[spot] = spot.access_rule
+                    spot.access_rule = self.countingRule(spot.access_rule, kind)
+
+    def countingRule(self, rule, kind):
+        counts = self.counts
+        def counting_rule(state, **kwargs):
+            counts[kind] += 1
+            return rule(state, **kwargs)
+        return counting_rule
+
+    def remove(self):
+        for spot, rule in self.originals.items():
+            spot.access_rule = rule
+
+# Time a phase over several runs, then run it once more to count rule calls and peak memory
+# setup() is untimed and gives the argument for each run, so that every run starts from the same state
+def measure(phase, repeat, world=None, setup=None):
+    times = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        phase(argument)
+        times.append(time.perf_counter() - start)
+
+    argument = setup() if setup else None
+    counter = RuleCounter(world) if world is not None else None
+    tracemalloc.start()
+    try:
+        result = phase(argument)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        if counter is not None:
+            counter.remove()
+
+    return result, {
+        'seconds_min': min(times),
+        'seconds_median': statistics.median(times),
+        'runs': repeat,
+        'rule_calls': counter.counts if counter is not None else None,
+        'peak_memory_bytes': peak,
+    }
+
+def runCase(case, repeat):
+    input_data = case['input_data']
+    results = {}
+
+    _, results['generate'] = measure(lambda _: HoodTracker.generate(copy.deepcopy(input_data), gui_dialog=False), repeat)
+    world, results['start_world'] = measure(lambda _: HoodTracker.startWorldBasedOnData(copy.deepcopy(input_data), gui_dialog=False), repeat)
+    explore_logic, results['explore_setup'] = measure(lambda _: ExploreLogic.ExploreLogic(world, copy.deepcopy(input_data)), repeat)
+
+    prog_items = world.state.prog_items.copy()
+    solve = lambda _: HoodTracker.solve(world, prog_items.copy())
+    _, results['solve'] = measure(solve, repeat, world=world)
+
+    collected = prog_items.copy()
+    for item in case.get('collect', []):
+        collected[item] += 1
+    incremental = lambda previous: HoodTracker.solve(world, collected.copy(), previous=previous)
+    _, results['solve_incremental'] = measure(incremental, repeat, world=world, setup=lambda: solve(None))
+
+    # Leave the world solved with the case's own inventory for the explore panel
+    solve(None)
+    entrances = explore_logic.entrances
+    please_explore = [entrances.exits[x].name for x in explore_logic.all_shuffled_ids if entrances.please_explore[x]]
+    possibilities = lambda _: [explore_logic.getPossibilities(name) for name in please_explore]
+    _, results['get_possibilities'] = measure(possibilities, repeat, world=world)
+    results['get_possibilities']['exits'] = len(please_explore)
+
+    routes = case.get('find_path', [])
+    find_paths = lambda _: [FindPath.findPath(world, prog_items.copy(), start, age, destination) for start, age, destination in routes]
+    _, results['find_path'] = measure(find_paths, repeat, world=world)
+    results['find_path']['routes'] = len(routes)
+
+    return results
+
+# Every phase that got slower (or evaluated more rules) than the baseline by more than the threshold
+def findRegressions(results, baseline, threshold):
+    regressions = []
+    for case_name, phases in results.items():
+        for phase_name, stats in phases.items():
+            old = baseline.get(case_name, {}).get(phase_name)
+            if old is None:
+                continue
+            if stats['seconds_median'] > old['seconds_median'] * threshold:
+                regressions.append("{} {}: {:.4f}s, baseline {:.4f}s".format(case_name, phase_name, stats['seconds_median'], old['seconds_median']))
+            if stats['rule_calls'] and old.get('rule_calls'):
+                calls = sum(stats['rule_calls'].values())
+                old_calls = sum(old['rule_calls'].values())
+                if calls > old_calls * threshold:
+                    regressions.append("{} {}: {} rule calls, baseline {}".format(case_name, phase_name, calls, old_calls))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time HoodTracker's world building, solver, path finding and explore panel without the GUI")
+    parser.add_argument('--corpus', default=CORPUS_DIR, help='Folder of benchmark cases')
+    parser.add_argument('--case', action='append', help='Only run this case (can be given more than once)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs of each phase')
+    parser.add_argument('--output', help='Write the results to this json file as well as stdout')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Results to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Fail when a phase is this many times slower than the baseline')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--rule-cache', default=None, help='Use this rule cache folder (off by default, so every run compiles the rules)')
+    parser.add_argument('--world-cache', default=None, help='Use this world snapshot folder (off by default, so every run builds the world)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    RuleCompiler.cache_dir = args.rule_cache
+    WorldSnapshot.snapshot_dir = args.world_cache
+
+    results = {}
+    for case in loadCorpus(args.corpus, args.case):
+        results[case['name']] = runCase(case, args.repeat)
+
+    output = {'python': sys.version, 'repeat': args.repeat, 'cases': results}
+    text = json.dumps(output, indent=4)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=4)
+            f.write("\n")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        logging.warning("No baseline at {}, so nothing to compare against".format(args.baseline))
+        return 0
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = findRegressions(results, baseline, args.threshold)
+    for regression in regressions:
+        logging.error("Regression: " + regression)
+    return 1 if regressions else 0
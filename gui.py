@@ -4,11 +4,13 @@ from collections import Counter
 try:
     import PySide2.QtWidgets as QtWidgets
     import PySide2.QtGui as QtGui
+    import PySide2.QtCore as QtCore
 except ModuleNotFoundError as e:
     logging.error("This needs the PySide2 library; please run \'pip install PySide2\'")
     raise e
 
 import sys
+import time
 import InventoryManager
 import ExploreManager
 import LocationManager
@@ -18,40 +20,144 @@ from MQManager import MQManager
 import DungeonShortcutsManager
 from SkippedTrialsManager import SkippedTrialsManager
 from EmptyDungeonsManager import EmptyDungeonsManager
+import SolveCache
+import Reconfigure
+import ExploreLogic
+import Multiworld
+import SpoilerImport
+import Transaction
+
+class FindPathDialog(QtWidgets.QDialog):
+    def __init__(self, all_regions, parent):
+        super().__init__()
 
+        self.parent = parent
+
+        all_regions.sort(key=str.casefold)
+        self.setWindowTitle("Find Path")
+        layout = QtWidgets.QVBoxLayout()
+
+        # Start widgets
+        start_label = QtWidgets.QLabel("Current region:")
+        self.start_combobox = QtWidgets.QComboBox()
+        for x in all_regions:
+            self.start_combobox.addItem(x)
+        start_age_label = QtWidgets.QLabel("Current age:")
+        self.start_age_combobox = QtWidgets.QComboBox()
+        self.start_age_combobox.addItem("child")
+        self.start_age_combobox.addItem("adult")
+
+        # End widgets
+        end_label = QtWidgets.QLabel("Ending region:")
+        self.end_combobox = QtWidgets.QComboBox()
+        for x in all_regions:
+            self.end_combobox.addItem(x)
+        end_age_label = QtWidgets.QLabel("Ending age:")
+        self.end_age_combobox = QtWidgets.QComboBox()
+        self.end_age_combobox.addItem("either")
+        self.end_age_combobox.addItem("child")
+        self.end_age_combobox.addItem("adult")
+
+        # Checkbox
+        self.checkbox = QtWidgets.QCheckBox()
+        check_layout = QtWidgets.QHBoxLayout()
+        check_layout.addWidget(QtWidgets.QLabel("Reboots OK:"))
+        check_layout.addWidget(self.checkbox)
+
+        # 2 rows lots of columns
+        horiz = QtWidgets.QHBoxLayout()
+        col1 = QtWidgets.QVBoxLayout()
+        col1.addWidget(start_label)
+        col1.addWidget(end_label)
+        col2 = QtWidgets.QVBoxLayout()
+        col2.addWidget(self.start_combobox)
+        col2.addWidget(self.end_combobox)
+        col3 = QtWidgets.QVBoxLayout()
+        col3.addWidget(start_age_label)
+        col3.addWidget(end_age_label)
+        col4 = QtWidgets.QVBoxLayout()
+        col4.addWidget(self.start_age_combobox)
+        col4.addWidget(self.end_age_combobox)
+        col5 = QtWidgets.QVBoxLayout()
+        col5.addStretch(1)
+        col5.addLayout(check_layout)
+        horiz.addLayout(col1)
+        horiz.addLayout(col2)
+        horiz.addLayout(col3)
+        horiz.addLayout(col4)
+        horiz.addLayout(col5)
+        layout.addLayout(horiz)
+
+        # Full row button, label, and text box
+        find_button = QtWidgets.QPushButton("Find Route")
+        find_button.clicked.connect(self.findSolution)
+        layout.addWidget(find_button)
+
+        self.solution = QtWidgets.QLabel("Solution:")
+        layout.addWidget(self.solution)
+
+        self.solution_display = QtWidgets.QPlainTextEdit()
+        layout.addWidget(self.solution_display)
+
+        self.setLayout(layout)
+
+    def findSolution(self):
+        both_ages = ['child', 'adult']
+        start_region = self.start_combobox.currentText()
+        start_age = self.start_age_combobox.currentText()
+        dest_region = self.end_combobox.currentText()
+        dest_age_selection = self.end_age_combobox.currentText()
+        if dest_age_selection == "either":
+            dest_ages = both_ages
+        elif dest_age_selection in both_ages:
+            dest_ages = [dest_age_selection]
+        else:
+            raise Exception()
+        reboot_as_last_resort = not self.checkbox.isChecked()
+
+        if start_region == dest_region and start_age in dest_ages:
+            answer = "Already there"
+        else:
+            answer = FindPath.findPath(self.parent.world, self.parent.getProgItems(), start_region, start_age, dest_region, destination_ages=dest_ages, reboot_as_last_resort=reboot_as_last_resort)
+            if answer is None:
+                answer = "Failure"
+        self.solution_display.setPlainText(answer)
+
+# The window shows up before the world is built, with a placeholder for each panel until it is ready
 class DisplayWindow(QtWidgets.QMainWindow):
-    def __init__(self, invManager, exploreManager, locManager, world, mqmanager, dungeon_shortcuts_manager,
-                 skipped_trials_manager, empty_dungeons_manager, find_path_dialog:FindPath.FindPathDialog):
+    def __init__(self):
         super().__init__()
-        self.world = world
-        self.find_path_dialog = find_path_dialog
+        self.find_path_dialog = None
 
         self.setWindowTitle('HoodTracker')
         self.resize(1500, 1200)
 
+        self.locations_placeholder = placeholderLabel("Building the world...")
+        self.explore_placeholder = placeholderLabel("")
+        self.inventory_placeholder = placeholderLabel("")
+
         # Left and right side split - Locations widget is on the left
         rightside_widget=QtWidgets.QWidget()
         split = QtWidgets.QHBoxLayout()
         split.setSpacing(10)
-        split.addWidget(locManager.widget, 1)
+        split.addWidget(self.locations_placeholder, 1)
         split.addWidget(rightside_widget, 1)
+        self.split_layout = split
 
         # Rightside upper = Explore widget
         # Rightside lower = Inventory widget
         rightside_layout = QtWidgets.QVBoxLayout()
-        rightside_layout.addWidget(exploreManager.widget, 1)
-        rightside_layout.addWidget(invManager.widget, 1)
+        rightside_layout.addWidget(self.explore_placeholder, 1)
+        rightside_layout.addWidget(self.inventory_placeholder, 1)
         rightside_widget.setLayout(rightside_layout)
+        self.rightside_layout = rightside_layout
 
-        # Add the MQ bar at the bottom
+        # The MQ bar goes at the bottom
         prevwidget = QtWidgets.QWidget()
         prevwidget.setLayout(split)
         mqsplit = QtWidgets.QVBoxLayout()
         mqsplit.addWidget(prevwidget)
-        mqsplit.addWidget(mqmanager.widget)
-        mqsplit.addWidget(dungeon_shortcuts_manager.widget)
-        mqsplit.addWidget(skipped_trials_manager.widget)
-        mqsplit.addWidget(empty_dungeons_manager.widget)
+        self.mqsplit_layout = mqsplit
 
         fullcanvas = QtWidgets.QWidget()
         fullcanvas.setLayout(mqsplit)
@@ -65,11 +171,77 @@ class DisplayWindow(QtWidgets.QMainWindow):
         self.change_settings_action = QtWidgets.QAction("Change &Settings String", self)
         self.change_settings_action.setShortcut('Ctrl+S')
         actions.append(self.change_settings_action)
+        self.switch_world_action = QtWidgets.QAction("Switch &World", self)
+        self.switch_world_action.setShortcut('Ctrl+W')
+        actions.append(self.switch_world_action)
+        self.import_action = QtWidgets.QAction("&Import Spoiler", self)
+        self.import_action.setShortcut('Ctrl+I')
+        actions.append(self.import_action)
         for action in actions:
+            action.setEnabled(False)
             self.menuBar().addAction(action)
+        self.actions = actions
+
+    def setLocationsWidget(self, widget):
+        self.split_layout.replaceWidget(self.locations_placeholder, widget)
+        self.locations_placeholder.deleteLater()
+
+    def setExploreWidget(self, widget):
+        self.rightside_layout.replaceWidget(self.explore_placeholder, widget)
+        self.explore_placeholder.deleteLater()
+
+    def setInventoryWidget(self, widget):
+        self.rightside_layout.replaceWidget(self.inventory_placeholder, widget)
+        self.inventory_placeholder.deleteLater()
+
+    def addBottomWidgets(self, widgets):
+        for widget in widgets:
+            self.mqsplit_layout.addWidget(widget)
+
+    def enableActions(self):
+        for action in self.actions:
+            action.setEnabled(True)
 
     def closeEvent(self, event:QtGui.QCloseEvent):
-        self.find_path_dialog.close()
+        if self.find_path_dialog is not None:
+            self.find_path_dialog.close()
+
+def placeholderLabel(text):
+    label = QtWidgets.QLabel(text)
+    label.setAlignment(QtCore.Qt.AlignCenter)
+    return label
+
+# How long each stage of startup took, logged once the window is complete
+class StartupTimings:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.stages = []
+
+    def stage(self, name):
+        now = time.perf_counter()
+        self.stages.append((name, now - self.last))
+        self.last = now
+
+    def log(self):
+        logging.info("Startup took {:.2f}s: {}".format(self.last - self.start, ", ".join("{} {:.2f}s".format(name, seconds) for name, seconds in self.stages)))
+
+# Builds the world and its first solve away from the GUI thread, so that the window shows up straight away
+class WorldLoader(QtCore.QThread):
+    loaded = QtCore.Signal()
+    failed = QtCore.Signal(object)
+
+    def __init__(self, hoodgui):
+        super().__init__()
+        self.hoodgui = hoodgui
+
+    def run(self):
+        try:
+            self.hoodgui.load_world()
+        except Exception:
+            self.failed.emit(sys.exc_info())
+            return
+        self.loaded.emit()
 
 def doWeWantThisLoc(loc, world):
     # Events / drops / gossipstones / fixed locations are auto-collected
@@ -102,15 +274,107 @@ class DialogSettingsManager(QtWidgets.QWidget):
         return text
 
 class HoodTrackerGui:
-    def __init__(self, filename, save_enabled=True, override_inventory=False):
+    def __init__(self, filename, save_enabled=True, override_inventory=False, solve_cache_filename=None):
+        self.timings = StartupTimings()
         self.save_enabled = save_enabled
         self.override_inventory = override_inventory
         self.filename = filename
+        self.solve_cache = SolveCache.SolveCache(filename=solve_cache_filename)
         self.input_data = HoodTracker.getInputData(filename)
         self.app = QtWidgets.QApplication(sys.argv)
-        self.init_world()
+        # In a multiworld seed every world is tracked, and the GUI shows one of them at a time
+        self.world_id = 0
+        self.input_datas = [self.input_data]
+        self.worlds = [None]
+        self.world = None
+        # Set once every panel has been built
+        self.loaded = False
+        # While a Transaction is open, changes wait for its commit to be solved
+        self.transaction = None
+        # Ask for a missing settings string now, since the world is built on another thread
+        self.world_count = HoodTracker.getSettings(self.input_data, gui_dialog=True).world_count
 
     def run(self):
+        self.window = DisplayWindow()
+        self.window.find_path_action.triggered.connect(self.launch_pathfind_dialog)
+        self.window.change_settings_action.triggered.connect(self.launch_settingsstring_dialog)
+        self.window.switch_world_action.triggered.connect(self.launch_switch_world_dialog)
+        self.window.switch_world_action.setVisible(self.world_count > 1)
+        self.window.import_action.triggered.connect(self.launch_import_dialog)
+        self.window.show()
+        self.timings.stage('window')
+
+        self.loader = WorldLoader(self)
+        self.loader.loaded.connect(self.world_loaded, QtCore.Qt.QueuedConnection)
+        self.loader.failed.connect(self.world_failed, QtCore.Qt.QueuedConnection)
+        self.loader.start()
+
+        self.app.exec_()
+        self.loader.wait()
+        if not self.loaded:
+            return
+
+        logging.info("Solve cache: {hits} hits, {misses} misses, {entries} entries".format(**self.solve_cache.stats()))
+        self.solve_cache.save()
+        self.input_data['equipment'] = self.invManager.getOutputFormat()
+        self.input_data['checked_off'] = self.locManager.getOutputFormat()
+        output_known_exits, output_known_exit_pairs = self.exploreManager.get_output()
+        if self.save_enabled and len(self.worlds) > 1:
+            # Every world of a multiworld seed is solved again with what the others have now sent it
+            explore_logics = [self.exploreManager if world_id == self.world_id else ExploreLogic.ExploreLogic(world, input_data)
+                              for world_id, (world, input_data) in enumerate(zip(self.worlds, self.input_datas))]
+            prog_items = [None] * len(self.worlds)
+            prog_items[self.world_id] = self.invManager.getProgItems(world=self.world)
+            Multiworld.writeWorlds(self.worlds, self.input_datas, explore_logics, self.filename, prog_items=prog_items, cache=self.solve_cache)
+        elif self.save_enabled:
+            HoodTracker.writeResultsToFile(world=self.world,
+                                           input_data=self.input_data,
+                                           output_data=self.output_data,
+                                           output_known_exits=output_known_exits,
+                                           filename=self.filename,
+                                           output_known_exit_pairs=output_known_exit_pairs)
+
+    # Runs on the WorldLoader thread: everything up to the first solve, none of which needs Qt
+    def load_world(self):
+        if self.world_count > 1:
+            self.input_datas = Multiworld.readWorldsData(self.filename, self.input_data)
+            self.worlds = Multiworld.generateWorlds(self.input_datas)
+            self.world = self.worlds[0]
+        else:
+            self.init_world()
+        self.timings.stage('world')
+
+        # Known exits go in before solving; the ExploreManager puts them in again later, which changes nothing
+        ExploreLogic.ExploreLogic(self.world, self.input_data)
+        # The inventory panel doesn't exist yet, so this solve goes by the save file's equipment
+        prog_items = Multiworld.progItems(self.input_datas, self.world_id)
+        self.output_data = HoodTracker.solve(self.world, prog_items=prog_items, cache=self.solve_cache)
+        self.timings.stage('first solve')
+
+    def world_loaded(self):
+        # One panel per pass of the event loop, so that each one shows up as soon as it is built
+        self.startup_stages = [self.build_inventory, self.build_explore, self.build_locations, self.build_bottom_bars, self.build_find_path]
+        QtCore.QTimer.singleShot(0, self.next_startup_stage)
+
+    def world_failed(self, exc_info):
+        exception_hook(*exc_info)
+
+    def next_startup_stage(self):
+        stage = self.startup_stages.pop(0)
+        stage()
+        self.timings.stage(stage.__name__)
+        if self.startup_stages:
+            QtCore.QTimer.singleShot(0, self.next_startup_stage)
+            return
+
+        self.loaded = True
+        # Catch up with the inventory panel, and with anything clicked while the panels were being built
+        self.updateLogic()
+        self.window.enableActions()
+        self.timings.stage('updateLogic')
+        self.timings.log()
+
+    def build_inventory(self):
         inv_list = InventoryManager.makeInventory(world=self.world, max_starting=self.override_inventory)
         self.invManager = InventoryManager.InventoryManager(inventory=inv_list, parent=self)
         if not self.override_inventory:
@@ -120,51 +384,27 @@ class HoodTrackerGui:
             for item, count in equipment_items.items():
                 self.invManager.collectItem(item, count=count)
         self.invManager.update_world(self.world)
-        prog_items = self.invManager.getProgItems(world=self.world)
+        self.window.setInventoryWidget(self.invManager.widget)
 
-        # Init ExploreManager now to use its logic for filling in known exits
+    def build_explore(self):
         self.exploreManager = ExploreManager.ExploreManager(self.world, parent=self, input_data=self.input_data)
+        self.window.setExploreWidget(self.exploreManager.widget)
 
-        self.output_data = HoodTracker.solve(self.world, prog_items=prog_items)
-
-        # Update ExploreManager widgets with the solve data
-        self.exploreManager.show_widgets()
+    def build_locations(self):
         self.locManager = LocationManager.LocationManager(self.world, parent_gui=self)
         self.populate_locations()
+        self.window.setLocationsWidget(self.locManager.widget)
 
-
+    def build_bottom_bars(self):
         self.mqmanager = MQManager(world=self.world, parent=self, input_data=self.input_data)
         self.dungeon_shortcuts_manager = DungeonShortcutsManager.DungeonShortcutsManager(world=self.world, parent=self, input_data=self.input_data)
         self.skipped_trials_manager = SkippedTrialsManager(world=self.world, parent=self, input_data=self.input_data)
         self.empty_dungeons_manager = EmptyDungeonsManager(world=self.world, parent=self, input_data=self.input_data)
+        self.window.addBottomWidgets([self.mqmanager.widget, self.dungeon_shortcuts_manager.widget, self.skipped_trials_manager.widget, self.empty_dungeons_manager.widget])
 
-        self.find_path_dialog = FindPath.FindPathDialog(all_regions=[x.name for x in self.world.regions], parent=self)
-        window = DisplayWindow(invManager=self.invManager,
-                               exploreManager=self.exploreManager,
-                               locManager=self.locManager,
-                               world=self.world,
-                               find_path_dialog=self.find_path_dialog,
-                               mqmanager=self.mqmanager,
-                               dungeon_shortcuts_manager=self.dungeon_shortcuts_manager,
-                               skipped_trials_manager=self.skipped_trials_manager,
-                               empty_dungeons_manager=self.empty_dungeons_manager)
-        self.window = window
-        window.find_path_action.triggered.connect(self.launch_pathfind_dialog)
-        window.change_settings_action.triggered.connect(self.launch_settingsstring_dialog)
-        window.show()
-
-        self.app.exec_()
-
-        self.input_data['equipment'] = self.invManager.getOutputFormat()
-        self.input_data['checked_off'] = self.locManager.getOutputFormat()
-        output_known_exits, output_known_exit_pairs = self.exploreManager.get_output()
-        if self.save_enabled:
-            HoodTracker.writeResultsToFile(world=self.world,
-                                           input_data=self.input_data,
-                                           output_data=self.output_data,
-                                           output_known_exits=output_known_exits,
-                                           filename=self.filename,
-                                           output_known_exit_pairs=output_known_exit_pairs)
+    def build_find_path(self):
+        self.find_path_dialog = FindPathDialog(all_regions=[x.name for x in self.world.regions], parent=self)
+        self.window.find_path_dialog = self.find_path_dialog
 
     def addKnownExit(self, exit_name, destination_name):
         self.output_known_exits[exit_name] = destination_name
@@ -189,13 +429,34 @@ class HoodTrackerGui:
         self.output_known_exit_pairs[exit.name] = paired_exit.name
         self.output_known_exit_pairs[paired_exit.name] = exit.name
 
+    # The inventory of the shown world, plus what the other worlds of a multiworld seed have sent it
+    def getProgItems(self):
+        prog_items = self.invManager.getProgItems(world=self.world)
+        if len(self.worlds) > 1:
+            prog_items = Multiworld.progItems(self.input_datas, self.world_id, prog_items)
+        return prog_items
+
+    # Show what the other worlds have sent in the inventory panel, before its amounts are read for a solve
+    def updateReceivedItems(self):
+        if len(self.worlds) > 1:
+            self.invManager.setReceived(Multiworld.receivedItems(self.world_id, self.input_datas))
+
+    # Record that a location of the shown world has an item for another world, which gets it once the location is checked off
+    def addSentItem(self, loc_name, item_name, receiver_id):
+        line = "{} gives {} to world {}".format(loc_name, item_name, receiver_id + 1)
+        logging.info("User has indicated that {}".format(line))
+        self.input_data.setdefault('sent_items', []).append(line)
+
     def updateLogic(self):
+        # Startup solves once every panel is there, and a transaction solves once when it is committed
+        if not self.loaded or self.transaction is not None:
+            return
+        self.updateReceivedItems()
         # Reset inventory to the state of the invManager
-        prog_items = self.invManager.getProgItems(world=self.world)
-        for exit in self.exploreManager.all_shuffled_exits:
-            exit.please_explore = False
-        self.output_data = HoodTracker.solve(self.world, prog_items=prog_items)
-        self.locManager.updateLocationPossible(self.output_data['possible_locations'], self.output_data['allkeys_possible_locations'])
+        prog_items = self.getProgItems()
+        # Only the difference from the last solve needs to be explored
+        self.output_data = HoodTracker.solve(self.world, prog_items=prog_items, previous=self.output_data, cache=self.solve_cache)
+        self.locManager.updateLocationPossible(self.output_data['possible_locations'], self.output_data['allkeys_possible_locations'], self.output_data['small_keys_needed'])
         self.locManager.updateLocationsIgnored(self.world)
         self.skipped_trials_manager.update_visibility(world=self.world, input_data=self.input_data)
         self.exploreManager.show_widgets()
@@ -204,7 +465,8 @@ class HoodTrackerGui:
         self.find_path_dialog.show()
 
     def init_world(self):
-        self.world = HoodTracker.startWorldBasedOnData(self.input_data, gui_dialog=True)
+        self.world = HoodTracker.startWorldBasedOnData(self.input_data, gui_dialog=True, world_id=self.world_id)
+        self.worlds[self.world_id] = self.world
 
     # Fill the LocationManager gui with the current set and state of locations
     def populate_locations(self):
@@ -214,17 +476,19 @@ class HoodTrackerGui:
             possible = loc in self.output_data['possible_locations']
             if not possible and loc in self.output_data['allkeys_possible_locations']:
                 possible = 2
+            keys_needed = self.output_data['small_keys_needed'].get(loc)
             checked = loc.name in self.input_data['checked_off']
             ignored = LocationManager.locationIsIgnored(self.world, loc)
-            locationEntry = LocationManager.LocationEntry(loc_name=loc.name, type=loc.type, possible=possible, checked=checked, parent_region=loc.parent_region.name, ignored=ignored, parent=self.locManager)
+            locationEntry = LocationManager.LocationEntry(loc_name=loc.name, type=loc.type, possible=possible, checked=checked, parent_region=loc.parent_region.name, ignored=ignored, parent=self.locManager, keys_needed=keys_needed)
             self.locManager.insertLocation(locationEntry)
 
     # Refresh all gui managers with the new self.world
     def update_world(self):
         # Get inventory and known exits before solving the logic
-        self.world.state.prog_items = self.invManager.getProgItems(world=self.world)
+        self.updateReceivedItems()
+        self.world.state.prog_items = self.getProgItems()
         self.exploreManager.update_world(world=self.world, input_data=self.input_data)
-        self.output_data = HoodTracker.solve(self.world, prog_items=self.world.state.prog_items)
+        self.output_data = HoodTracker.solve(self.world, prog_items=self.world.state.prog_items, cache=self.solve_cache)
         self.locManager.update_world(self.world)
         # Update GUIs
         self.populate_locations()
@@ -237,6 +501,7 @@ class HoodTrackerGui:
 
     # Save the current state of the world / gui managers into input_data
     def save_current_data_to_input_data(self):
+        self.input_data['equipment'] = self.invManager.getOutputFormat()
         self.input_data['checked_off'] = sorted(self.locManager.getOutputFormat())
         self.input_data['dungeon_mqs'] = [name for name in self.world.dungeon_mq if self.world.dungeon_mq[name]]
         output_known_exits, output_known_exit_pairs = self.exploreManager.get_output()
@@ -244,18 +509,50 @@ class HoodTrackerGui:
         self.input_data['paired_exits'] = output_known_exit_pairs
 
     def update_input_information(self, key, data):
-        # TODO: not all of these really need the world to be regenerated, if you handle the settings changes better
+        # Applied to the world if that can be done without generating it again
+        with self.begin() as transaction:
+            transaction.setChoices(key, data)
+
+    # Start a batch of changes that is solved once, when it is committed (see Transaction)
+    def begin(self):
+        assert self.transaction is None
         # Route the "output" information to the input again so it isn't lost
         self.save_current_data_to_input_data()
-        # Apply changes to the input data
-        self.input_data[key] = data
-        # Regenerate the world again with new settings and send it to the GUI elements
-        self.init_world()
-        self.update_world()
+        self.transaction = Transaction.Transaction(self, self.world, self.input_data, self.exploreManager)
+        return self.transaction
+
+    # The panels take on what the transaction changed, then there is one solve (after generating the world again, if it has to be)
+    def commitTransaction(self, transaction):
+        self.transaction = None
+        if transaction.regenerate:
+            self.init_world()
+        if transaction.regenerate or transaction.reshaped:
+            # Limits first, since MQ dungeons can have more small keys
+            self.invManager.update_world(self.world)
+        if transaction.items_changed:
+            self.invManager.setEquipment(self.input_data['equipment'])
+        if transaction.regenerate or transaction.reshaped:
+            self.update_world()
+        else:
+            self.updateLogic()
 
     def update_settings_string(self, new_settings_string):
         self.save_current_data_to_input_data()
         old_settings_string = self.world.settings.settings_string
+        # Tricks and entrance settings are applied to the world we already have
+        try:
+            changes = Reconfigure.reconfigureSettings(self.world, self.input_data, new_settings_string)
+        except HoodTracker.BadSettingsStringException as e:
+            logging.error("Invalid settings string: {}".format(e))
+            self.input_data['settings_string'] = [old_settings_string]
+            return
+        if changes is not None:
+            if changes['entrances']:
+                # The exits have been shuffled again, so the explore panel and locations start over
+                self.update_world()
+            else:
+                self.updateLogic()
+            return
         # Regenerate the world again with new settings and send it to the GUI elements
         self.input_data['settings_string'] = [new_settings_string]
         try:
@@ -267,20 +564,8 @@ class HoodTrackerGui:
         self.update_world()
 
     def updateLocationWallets(self, locname, numwallets):
-        # Route the "output" information to the input again so it isn't lost
-        self.save_current_data_to_input_data()
-
-        # Add to wallet list it should be in, and remove from any wallet lists it shouldn't be in
-        wallet_lists = { 1: self.input_data['one_wallet'], 2: self.input_data['two_wallets']}
-        for num,walletlist in wallet_lists.items():
-            while locname in walletlist:
-                walletlist.remove(locname)
-            if numwallets == num:
-                walletlist.append(locname)
-
-        # Regenerate the world again with new settings and send it to the GUI elements
-        self.init_world()
-        self.update_world()
+        with self.begin() as transaction:
+            transaction.setWallets(locname, numwallets)
 
     def launch_settingsstring_dialog(self):
         old_settings_string = self.world.settings.settings_string
@@ -299,6 +584,35 @@ class HoodTrackerGui:
         logging.info("Updating settings string to " + new_string)
         self.update_settings_string(new_string)
 
+    def launch_import_dialog(self):
+        filename, _ = QtWidgets.QFileDialog.getOpenFileName(self.window.fullcanvas_widget, "Import Spoiler Log or Plando", "", "JSON files (*.json);;All files (*)")
+        if not filename:
+            return
+        try:
+            SpoilerImport.importFile(self, filename, world_id=self.world_id)
+        except (OSError, ValueError) as e:
+            logging.error("Couldn't import {}: {}".format(filename, e))
+            show_warning_popup("Couldn't import {}: {}".format(filename, e))
+
+    def launch_switch_world_dialog(self):
+        names = ["World {}".format(world_id + 1) for world_id in range(len(self.worlds))]
+        name, ok = QtWidgets.QInputDialog.getItem(self.window.fullcanvas_widget, "Switch World", "Track world:", names, self.world_id, False)
+        if not ok or names.index(name) == self.world_id:
+            return
+        self.switch_world(names.index(name))
+
+    # Show another world of a multiworld seed, keeping what was tracked in this one
+    def switch_world(self, world_id):
+        self.save_current_data_to_input_data()
+        self.world_id = world_id
+        self.world = self.worlds[world_id]
+        self.input_data = self.input_datas[world_id]
+        # Limits first, since this world's MQ dungeons can have more small keys
+        self.invManager.update_world(self.world)
+        self.invManager.setEquipment(self.input_data['equipment'])
+        self.update_world()
+        self.window.setWindowTitle('HoodTracker - World {}'.format(world_id + 1))
+
 def show_warning_popup(message):
     msgBox = QtWidgets.QMessageBox()
     msgBox.setIcon(QtWidgets.QMessageBox.Information)
@@ -313,8 +627,8 @@ def exception_hook(exctype, value, traceback):
     # Pyside2 will continue unless we do this
     sys.exit(1)
 
-def main(filename):
+def main(filename, solve_cache_filename=None):
     sys.excepthook = exception_hook
 
-    hoodgui = HoodTrackerGui(filename)
+    hoodgui = HoodTrackerGui(filename, solve_cache_filename=solve_cache_filename)
     hoodgui.run()